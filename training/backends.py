@@ -0,0 +1,206 @@
+"""
+Inference Backends
+Runtimes that AdQualityPredictor can use to execute the model:
+- keras:  full TensorFlow/Keras (.keras files)
+- tflite: TFLite interpreter, via tflite_runtime when installed (.tflite files)
+- numpy:  pure NumPy reference implementation of the layer stack (.npz files
+          written by export_serving_model.export_numpy_model)
+
+Every backend exposes input_shape, timings and predict(images) -> (N, 2).
+Heavy imports happen inside the backend that needs them, so a numpy
+deployment never imports TensorFlow.
+"""
+
+import json
+import time
+import numpy as np
+
+BACKENDS = ('keras', 'tflite', 'numpy')
+
+
+class KerasBackend:
+    def __init__(self, model_path, fast_start=False):
+        """Load a Keras model; fast_start pre-traces a fixed-signature serving function"""
+        start = time.perf_counter()
+        import tensorflow as tf
+        from tensorflow import keras
+        import serving_layers  # noqa: F401  registers the serving model's custom layers
+        self.tf = tf
+        self.timings = {'import_seconds': time.perf_counter() - start}
+
+        start = time.perf_counter()
+        self.model = keras.models.load_model(model_path, compile=False)
+        self.timings['load_seconds'] = time.perf_counter() - start
+        self.input_shape = tuple(self.model.input_shape)
+
+        self.serving_fn = None
+        if fast_start:
+            start = time.perf_counter()
+            self.serving_fn = self._build_serving_fn()
+            self.timings['trace_seconds'] = time.perf_counter() - start
+
+    def _build_serving_fn(self):
+        """Trace the forward pass once for (None, H, W, 3) uint8 input"""
+        tf = self.tf
+        model = self.model
+
+        @tf.function(input_signature=[
+            tf.TensorSpec(shape=(None,) + tuple(model.input_shape[1:]), dtype=tf.uint8)
+        ])
+        def serve(images):
+            return model(tf.cast(images, tf.float32), training=False)
+
+        return serve.get_concrete_function()
+
+    def predict(self, images):
+        """Raw model outputs for a uint8 image batch"""
+        if self.serving_fn is not None:
+            return self.serving_fn(self.tf.constant(images, dtype=self.tf.uint8)).numpy()
+        return self.model.predict(images, batch_size=len(images), verbose=0)
+
+
+class TFLiteBackend:
+    def __init__(self, model_path, num_threads=None):
+        """Load a TFLite flatbuffer, preferring the standalone tflite_runtime package
+
+        Handles quantized (int8/uint8) inputs and outputs, so the float16 and
+        int8 variants produced by quantize_model.py run like the float model.
+        """
+        start = time.perf_counter()
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.timings = {'import_seconds': time.perf_counter() - start}
+
+        start = time.perf_counter()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._refresh_details()
+        self.timings['load_seconds'] = time.perf_counter() - start
+        self.input_shape = (None,) + tuple(int(d) for d in self.input_detail['shape'][1:])
+
+    def _refresh_details(self):
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+
+    def predict(self, images):
+        """Run the whole batch in one interpreter invocation"""
+        images = np.asarray(images)
+        if self.input_detail['shape'][0] != len(images):
+            self.interpreter.resize_tensor_input(
+                self.input_detail['index'], [len(images)] + list(self.input_shape[1:])
+            )
+            self.interpreter.allocate_tensors()
+            self._refresh_details()
+
+        self.interpreter.set_tensor(self.input_detail['index'], self._quantize(images))
+        self.interpreter.invoke()
+        return self._dequantize(self.interpreter.get_tensor(self.output_detail['index']))
+
+    def _quantize(self, images):
+        """Map float pixel values onto the input tensor's dtype"""
+        dtype = self.input_detail['dtype']
+        scale, zero_point = self.input_detail['quantization']
+        if np.issubdtype(dtype, np.integer) and scale:
+            info = np.iinfo(dtype)
+            images = np.round(images.astype(np.float32) / scale + zero_point)
+            return np.clip(images, info.min, info.max).astype(dtype)
+        return images.astype(dtype)
+
+    def _dequantize(self, outputs):
+        """Convert quantized outputs back to float32"""
+        scale, zero_point = self.output_detail['quantization']
+        if np.issubdtype(outputs.dtype, np.integer) and scale:
+            return (outputs.astype(np.float32) - zero_point) * scale
+        return outputs.astype(np.float32)
+
+
+class NumpyBackend:
+    def __init__(self, model_path):
+        """Load a flat .npz model: a JSON layer spec plus one array per weight"""
+        self.timings = {'import_seconds': 0.0}
+        start = time.perf_counter()
+        with np.load(model_path, allow_pickle=False) as data:
+            spec = json.loads(str(data['spec']))
+            self.layers = []
+            for i, layer in enumerate(spec['layers']):
+                weights = [data[f'layer{i}_w{j}'].astype(np.float32)
+                           for j in range(layer.get('n_weights', 0))]
+                self.layers.append((layer, weights))
+        self.input_shape = (None,) + tuple(spec['input_shape'])
+        self.timings['load_seconds'] = time.perf_counter() - start
+
+    def predict(self, images):
+        """Forward pass, one image at a time to bound im2col memory"""
+        outputs = [self._forward(img.astype(np.float32)) for img in np.asarray(images)]
+        return np.stack(outputs)
+
+    def _forward(self, x):
+        for layer, weights in self.layers:
+            kind = layer['type']
+            if kind == 'Conv2D':
+                x = _conv2d(x, weights[0], layer['strides'], layer['padding'])
+                if len(weights) > 1:
+                    x += weights[1]
+            elif kind == 'MaxPooling2D':
+                x = _max_pool(x, layer['pool_size'], layer['strides'], layer['padding'])
+            elif kind == 'GlobalAveragePooling2D':
+                x = x.mean(axis=(0, 1))
+            elif kind == 'Dense':
+                x = x @ weights[0] + (weights[1] if len(weights) > 1 else 0)
+            elif kind in ('BatchNormalization', 'Rescaling'):
+                x = x * weights[0] + weights[1]
+            elif kind == 'ChannelOffset':
+                x = x + weights[0]
+            else:
+                raise ValueError(f"Unsupported layer type in numpy model: {kind}")
+
+            if layer.get('activation') == 'relu':
+                np.maximum(x, 0, out=x)
+        return x
+
+
+def _conv2d(x, kernel, strides, padding):
+    """2D convolution of one (H, W, C) image via im2col"""
+    kh, kw = kernel.shape[:2]
+    if padding == 'same':
+        in_h, in_w = x.shape[:2]
+        out_h, out_w = -(-in_h // strides[0]), -(-in_w // strides[1])
+        pad_h = max((out_h - 1) * strides[0] + kh - in_h, 0)
+        pad_w = max((out_w - 1) * strides[1] + kw - in_w, 0)
+        x = np.pad(x, ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0)))
+    windows = np.lib.stride_tricks.sliding_window_view(x, (kh, kw), axis=(0, 1))
+    windows = windows[::strides[0], ::strides[1]]
+    # windows: (H', W', C, kh, kw); kernel: (kh, kw, C, O)
+    return np.tensordot(windows, kernel.transpose(2, 0, 1, 3), axes=([2, 3, 4], [0, 1, 2]))
+
+
+def _max_pool(x, pool_size, strides, padding):
+    """Max pooling of one (H, W, C) image for the non-overlapping 'valid' case"""
+    if list(pool_size) != list(strides) or padding != 'valid':
+        raise ValueError("numpy backend only supports non-overlapping 'valid' max pooling")
+    ph, pw = pool_size
+    h, w, c = x.shape
+    x = x[:h // ph * ph, :w // pw * pw]
+    return x.reshape(h // ph, ph, w // pw, pw, c).max(axis=(1, 3))
+
+
+def load_backend(model_path, backend='auto', fast_start=False):
+    """Pick a backend by name, or from the file extension when backend='auto'"""
+    if backend == 'auto':
+        if model_path.endswith('.tflite'):
+            backend = 'tflite'
+        elif model_path.endswith('.npz'):
+            backend = 'numpy'
+        else:
+            backend = 'keras'
+
+    if backend == 'keras':
+        return KerasBackend(model_path, fast_start=fast_start)
+    if backend == 'tflite':
+        return TFLiteBackend(model_path)
+    if backend == 'numpy':
+        return NumpyBackend(model_path)
+    raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
@@ -0,0 +1,197 @@
+"""
+Bulk Scoring CLI
+Streams AdQualityPredictor results for a directory tree or a JSONL manifest
+into a JSONL file, with a checkpoint so interrupted runs resume
+
+Usage:
+  python bulk_score.py --input-dir ../assets --output ../logs/scores.jsonl
+  python bulk_score.py --manifest paths.jsonl --output scores.jsonl --resume
+  python bulk_score.py --input-dir ../assets --output scores.jsonl --profile
+"""
+
+import argparse
+import contextlib
+import json
+import os
+from itertools import islice
+
+from inference import AdQualityPredictor
+from profiling import python_profile, THREADS_PROFILED
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def walk_images(root):
+    """Lazily yield image paths under root in a stable, sorted order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def read_manifest(manifest_path):
+    """Lazily yield image paths from a JSONL manifest
+
+    Each line is either a JSON string or an object with an "image_path"
+    (or "path") field. Blank lines are skipped.
+    """
+    with open(manifest_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield record
+            else:
+                yield record.get('image_path') or record['path']
+
+
+def load_checkpoint(checkpoint_path, source):
+    """Return the saved checkpoint for this source, or None"""
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != source:
+        raise ValueError(
+            f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('source')!r}, not {source!r}"
+        )
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def bulk_score(predictor, paths, output_path, source, resume=False, batch_size=32,
+               num_workers=4, prefetch_batches=2, checkpoint_every=1):
+    """Score paths, appending one JSON line per image to output_path
+
+    Memory stays constant: paths are consumed lazily and results are written
+    as each batch completes. After every checkpoint_every batches the output
+    is fsynced and the number of consumed inputs plus the output size are
+    recorded; on resume the output is truncated back to that size (dropping
+    any partially written batch) and those inputs are skipped.
+    """
+    checkpoint_path = output_path + '.checkpoint.json'
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    checkpoint = load_checkpoint(checkpoint_path, source) if resume else None
+
+    if checkpoint is not None:
+        done = checkpoint['inputs_done']
+        out = open(output_path, 'r+b' if os.path.exists(output_path) else 'w+b')
+        out.truncate(checkpoint['output_bytes'])
+        out.seek(0, os.SEEK_END)
+        paths = islice(paths, done, None)
+        print(f"↩️  Resuming after {done} images")
+    else:
+        done = 0
+        out = open(output_path, 'wb')
+
+    errors = 0
+    since_checkpoint = 0
+    try:
+        results = predictor.iter_predict(paths, batch_size, num_workers, prefetch_batches)
+        while True:
+            batch = list(islice(results, batch_size))
+            if not batch:
+                break
+            for result in batch:
+                errors += 'error' in result
+                out.write((json.dumps(result) + '\n').encode('utf-8'))
+            done += len(batch)
+            since_checkpoint += 1
+
+            if since_checkpoint >= checkpoint_every:
+                out.flush()
+                os.fsync(out.fileno())
+                save_checkpoint(checkpoint_path, {
+                    'source': source,
+                    'inputs_done': done,
+                    'output_bytes': out.tell()
+                })
+                since_checkpoint = 0
+                print(f"  Scored {done} images ({errors} errors)", end='\r')
+
+        out.flush()
+        os.fsync(out.fileno())
+        save_checkpoint(checkpoint_path, {
+            'source': source,
+            'inputs_done': done,
+            'output_bytes': out.tell(),
+            'complete': True
+        })
+    finally:
+        out.close()
+
+    print(f"\n✅ Scored {done} images ({errors} errors) -> {output_path}")
+    return done, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RetailSync AI bulk ad scoring')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input-dir', help='Directory tree of images to score')
+    source.add_argument('--manifest', help='JSONL manifest of image paths')
+    parser.add_argument('--output', required=True, help='JSONL file to write results to')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue from the checkpoint next to --output')
+    parser.add_argument('--model', default='../models/ad_quality_model_latest.keras')
+    parser.add_argument('--backend', default='auto', choices=['auto', 'keras', 'tflite', 'numpy'],
+                        help='Inference runtime (auto picks it from the model file extension)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4, help='Decode threads (0 decodes on the main thread)')
+    parser.add_argument('--prefetch', type=int, default=2, help='Batches decoded ahead')
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                        help='Batches between checkpoints')
+    parser.add_argument('--cache-path', default=None,
+                        help='Optional SQLite file for a persistent prediction cache')
+    parser.add_argument('--fast-start', action='store_true',
+                        help='Pre-trace a fixed-signature serving function at load time')
+    parser.add_argument('--warm-up', action='store_true',
+                        help='Run one dummy batch before serving')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profiler trace of some batches plus a Python profile of '
+                             'decoding (logs/profile)')
+    parser.add_argument('--profile-start', type=int, default=1,
+                        help='First traced batch (0 includes one-time setup)')
+    parser.add_argument('--profile-batches', type=int, default=5, help='Batches to trace')
+    args = parser.parse_args()
+
+    if args.input_dir:
+        source_id = 'dir:' + os.path.abspath(args.input_dir)
+        paths = walk_images(args.input_dir)
+    else:
+        source_id = 'manifest:' + os.path.abspath(args.manifest)
+        paths = read_manifest(args.manifest)
+
+    predictor = AdQualityPredictor(args.model, cache_path=args.cache_path,
+                                   fast_start=args.fast_start, warm_up=args.warm_up,
+                                   backend=args.backend)
+    predictor.report_startup()
+    num_workers = args.workers
+    if args.profile:
+        predictor.profile_batches(args.profile_start, args.profile_batches)
+        if not THREADS_PROFILED:
+            # The profile would miss decoding on worker threads
+            print("ℹ️  Python 3.12+: decoding on the main thread so the profile covers it")
+            num_workers = 0
+    with python_profile('bulk_score') if args.profile else contextlib.nullcontext():
+        bulk_score(predictor, paths, args.output, source_id, resume=args.resume,
+                   batch_size=args.batch_size, num_workers=num_workers,
+                   prefetch_batches=args.prefetch, checkpoint_every=args.checkpoint_every)
+    predictor.close_profile()
+
+
+if __name__ == "__main__":
+    main()
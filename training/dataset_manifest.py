@@ -0,0 +1,109 @@
+"""
+Dataset Manifest
+One JSON record per file under data/: content hash, size, mtime, tier and
+label. Data preparation consults it to skip samples that are already on
+disk and unchanged, and dataset metadata counts are derived from it.
+"""
+
+import os
+import json
+import hashlib
+from collections import Counter
+
+MANIFEST_PATH = '../data/manifest.json'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetManifest:
+    def __init__(self, path=MANIFEST_PATH):
+        """Load the manifest at path (an empty one if it does not exist yet)
+
+        Entries are keyed by file path relative to the manifest's directory.
+        """
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)['samples']
+
+    def key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def get(self, path):
+        return self.entries.get(self.key(path))
+
+    def is_current(self, path, **expected):
+        """True if path is recorded, unchanged on disk (size + mtime) and matches expected fields"""
+        entry = self.get(path)
+        if entry is None or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return False
+        return all(entry.get(name) == value for name, value in expected.items())
+
+    def record(self, path, tier=None, label=None, sha256=None, **extra):
+        """Add or replace the entry for path; the file is hashed unless sha256 is given"""
+        stat = os.stat(path)
+        entry = {
+            'sha256': sha256 or file_sha256(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'tier': tier,
+            'label': label
+        }
+        entry.update(extra)
+        self.entries[self.key(path)] = entry
+        return entry
+
+    def digests(self):
+        return {entry['sha256'] for entry in self.entries.values()}
+
+    def samples(self, source=None):
+        """Entries that are training samples (have a tier), optionally from one source"""
+        return {
+            key: entry for key, entry in self.entries.items()
+            if entry.get('tier') and (source is None or entry.get('source') == source)
+        }
+
+    def prune(self):
+        """Drop entries whose files no longer exist; returns how many were dropped"""
+        missing = [key for key in self.entries
+                   if not os.path.exists(os.path.join(self.root, key))]
+        for key in missing:
+            del self.entries[key]
+        return len(missing)
+
+    def remove(self, keys):
+        """Delete the files behind keys and drop their entries; returns how many"""
+        for key in keys:
+            path = os.path.join(self.root, key)
+            if os.path.exists(path):
+                os.remove(path)
+            del self.entries[key]
+        return len(keys)
+
+    def counts(self):
+        """Sample counts in total, per tier and per source"""
+        samples = self.samples().values()
+        return {
+            'total_samples': len(samples),
+            'tiers': dict(Counter(entry['tier'] for entry in samples)),
+            'sources': dict(Counter(entry.get('source', 'unknown') for entry in samples))
+        }
+
+    def save(self):
+        """Write atomically so an interrupted run never leaves a truncated manifest"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'samples': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,291 @@
+"""
+Serving Model Export
+Builds an inference-only copy of the ad quality model:
+1. Augmentation and Dropout layers are removed (identity at inference)
+2. Rescaling is fused into the first Conv2D kernel
+3. BatchNormalization is folded into the next Conv2D's weights; before a
+   'same'-padded conv only its scale is, leaving a per-channel offset
+
+The serving model is verified numerically against the original before it
+is saved, and also written as a flat .npz for the TensorFlow-free numpy
+backend.
+
+Usage:
+  python export_serving_model.py [model_path] [output_path]
+"""
+
+import sys
+import json
+import time
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras import layers
+
+from backends import NumpyBackend
+from serving_layers import ChannelOffset
+
+SERVING_MODEL_PATH = '../models/ad_quality_model_serving.keras'
+NUMPY_MODEL_PATH = '../models/ad_quality_model_serving.npz'
+
+# Layer types the numpy backend can execute
+NUMPY_LAYERS = (
+    layers.Conv2D,
+    layers.MaxPooling2D,
+    layers.GlobalAveragePooling2D,
+    layers.Dense,
+    layers.BatchNormalization,
+    layers.Rescaling,
+    ChannelOffset,
+)
+
+# Layers that are the identity function when training=False
+INFERENCE_IDENTITY_LAYERS = (
+    layers.RandomFlip,
+    layers.RandomRotation,
+    layers.RandomZoom,
+    layers.Dropout,
+)
+
+
+def _clone_layer(layer, x):
+    """Re-create a layer with the same config and weights on top of x"""
+    clone = layer.__class__.from_config(layer.get_config())
+    y = clone(x)
+    clone.set_weights(layer.get_weights())
+    return y
+
+
+def _batch_norm_affine(layer):
+    """Per-channel (scale, shift) that an inference-mode BatchNormalization applies"""
+    mean = np.asarray(layer.moving_mean)
+    variance = np.asarray(layer.moving_variance)
+    gamma = np.asarray(layer.gamma) if layer.gamma is not None else np.ones_like(mean)
+    beta = np.asarray(layer.beta) if layer.beta is not None else np.zeros_like(mean)
+    scale = gamma / np.sqrt(variance + layer.epsilon)
+    return scale, beta - mean * scale
+
+
+def _is_channels_last_batch_norm(layer):
+    """Only BatchNormalization over the last axis of a 4D tensor is folded"""
+    if not isinstance(layer, layers.BatchNormalization):
+        return False
+    axis = layer.axis if isinstance(layer.axis, (list, tuple)) else [layer.axis]
+    return list(axis) in ([-1], [3])
+
+
+def _shift_folds_exactly(conv):
+    """True if conv never sees zero padding, so an input shift is a per-channel bias"""
+    return conv.padding == 'valid' or tuple(conv.kernel_size) == (1, 1)
+
+
+def _folded_conv(conv, x, input_scale=None, affine=None):
+    """Apply conv to x with a preceding Rescaling and/or BatchNorm folded in
+
+    A multiplicative input scale moves straight into the kernel. For a
+    per-channel affine (a, c) on the input, conv(a * x + c) equals
+    conv(x; kernel * a) plus a per-channel bias sum(kernel * c); this only
+    holds where no zero padding falls under the kernel (see
+    _shift_folds_exactly). Under zero padding, a * x + c = a * (x + c / a)
+    is exact instead: callers add c / a with a ChannelOffset and pass
+    (a, 0), since a * 0 is still the zero the conv pads with.
+    """
+    weights = conv.get_weights()
+    kernel = weights[0].copy()
+    bias = weights[1] if conv.use_bias else np.zeros(kernel.shape[-1], dtype=kernel.dtype)
+
+    if input_scale is not None:
+        kernel *= np.reshape(input_scale, (1, 1, -1, 1)).astype(kernel.dtype)
+
+    if affine is not None:
+        scale, shift = affine
+        bias = bias + shift.astype(kernel.dtype) @ kernel.sum(axis=(0, 1))
+        kernel *= scale.reshape(1, 1, -1, 1).astype(kernel.dtype)
+
+    config = conv.get_config()
+    config['use_bias'] = True
+    folded = layers.Conv2D.from_config(config)
+    y = folded(x)
+    folded.set_weights([kernel, bias])
+    return y
+
+
+def build_serving_model(model):
+    """Return (serving_model, summary of what was removed or folded)"""
+    inputs = keras.Input(shape=model.input_shape[1:], name='image')
+    x = inputs
+    pending_scale = None  # Rescaling layer waiting for the next Conv2D
+    pending_norm = None   # BatchNormalization layer waiting for the next Conv2D
+    summary = {'removed': [], 'fused_rescaling': [], 'folded_batch_norm': [], 'kept_batch_norm': []}
+
+    for layer in model.layers:
+        if isinstance(layer, INFERENCE_IDENTITY_LAYERS):
+            summary['removed'].append(layer.name)
+            continue
+
+        if (isinstance(layer, layers.Rescaling) and pending_scale is None
+                and pending_norm is None and float(np.max(np.abs(layer.offset))) == 0.0):
+            pending_scale = layer
+            continue
+
+        if (_is_channels_last_batch_norm(layer) and pending_scale is None
+                and pending_norm is None and len(x.shape) == 4):
+            pending_norm = layer
+            continue
+
+        affine = _batch_norm_affine(pending_norm) if pending_norm else None
+        if type(layer) is layers.Conv2D and affine is not None and not _shift_folds_exactly(layer):
+            # Zero padding would see the shift at the border: fold only the scale
+            scale, shift = affine
+            if np.all(scale != 0):
+                offset = ChannelOffset(len(shift), name=f'{pending_norm.name}_offset')
+                x = offset(x)
+                offset.set_weights([(shift / scale).astype(np.float32)])
+                affine = (scale, np.zeros_like(shift))
+            else:
+                x = _clone_layer(pending_norm, x)
+                summary['kept_batch_norm'].append(pending_norm.name)
+                pending_norm = affine = None
+
+        if type(layer) is layers.Conv2D and (pending_scale is not None or pending_norm is not None):
+            input_scale = np.asarray(pending_scale.scale, dtype=np.float32) if pending_scale else None
+            x = _folded_conv(layer, x, input_scale, affine)
+            if pending_scale is not None:
+                summary['fused_rescaling'].append(f'{pending_scale.name} -> {layer.name}')
+            if pending_norm is not None:
+                summary['folded_batch_norm'].append(f'{pending_norm.name} -> {layer.name}')
+            pending_scale = pending_norm = None
+            continue
+
+        # Nothing to fold into: apply any pending layer unchanged
+        for pending in (pending_scale, pending_norm):
+            if pending is not None:
+                x = _clone_layer(pending, x)
+        pending_scale = pending_norm = None
+        x = _clone_layer(layer, x)
+
+    for pending in (pending_scale, pending_norm):
+        if pending is not None:
+            x = _clone_layer(pending, x)
+
+    serving_model = keras.Model(inputs, x, name='ad_quality_serving')
+    return serving_model, summary
+
+
+def _time_per_image(model, images, repeats=5):
+    """Median milliseconds per image for model(images)"""
+    model(images, training=False)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model(images, training=False)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000 / len(images)
+
+
+def verify_serving_model(model, serving_model, n_samples=16, tolerance=1e-3, seed=42):
+    """Compare both models on random images; raises if outputs diverge
+
+    The tolerance is relative to the largest reference output, since quality
+    scores are on a 0-100 scale and compliance on 0-1.
+    """
+    rng = np.random.default_rng(seed)
+    images = rng.integers(0, 256, (n_samples,) + tuple(model.input_shape[1:])).astype(np.float32)
+    reference = np.asarray(model(images, training=False))
+    candidate = np.asarray(serving_model(images, training=False))
+    max_diff = float(np.max(np.abs(reference - candidate)))
+    relative_diff = max_diff / max(1.0, float(np.max(np.abs(reference))))
+
+    report = {
+        'max_abs_diff': max_diff,
+        'relative_diff': relative_diff,
+        'original_ms_per_image': _time_per_image(model, images),
+        'serving_ms_per_image': _time_per_image(serving_model, images),
+        'original_params': int(model.count_params()),
+        'serving_params': int(serving_model.count_params()),
+    }
+    if relative_diff > tolerance:
+        raise ValueError(
+            f"Serving model diverges from original: max abs diff {max_diff:.6f} "
+            f"(relative {relative_diff:.2e} > {tolerance:.0e})"
+        )
+    return report
+
+
+def export_numpy_model(serving_model, output_path=NUMPY_MODEL_PATH):
+    """Write a serving model as a flat .npz: a JSON layer spec plus weight arrays"""
+    spec = {'input_shape': list(serving_model.input_shape[1:]), 'layers': []}
+    arrays = {}
+
+    for layer in serving_model.layers:
+        if isinstance(layer, layers.InputLayer):
+            continue
+        if type(layer) not in NUMPY_LAYERS:
+            raise ValueError(f"numpy backend cannot run layer {layer.name} ({type(layer).__name__})")
+
+        entry = {'type': type(layer).__name__, 'name': layer.name}
+        weights = layer.get_weights()
+        if isinstance(layer, layers.BatchNormalization):
+            weights = list(_batch_norm_affine(layer))
+        elif isinstance(layer, layers.Rescaling):
+            weights = [np.asarray(layer.scale, dtype=np.float32), np.asarray(layer.offset, dtype=np.float32)]
+        elif isinstance(layer, layers.Conv2D):
+            if tuple(layer.dilation_rate) != (1, 1):
+                raise ValueError(f"numpy backend does not support dilated conv {layer.name}")
+            entry.update({'strides': list(layer.strides), 'padding': layer.padding})
+        elif isinstance(layer, layers.MaxPooling2D):
+            entry.update({'pool_size': list(layer.pool_size), 'strides': list(layer.strides),
+                          'padding': layer.padding})
+
+        if hasattr(layer, 'activation'):
+            activation = layer.activation.__name__
+            if activation not in ('relu', 'linear'):
+                raise ValueError(f"numpy backend does not support activation {activation}")
+            entry['activation'] = activation
+
+        entry['n_weights'] = len(weights)
+        for j, weight in enumerate(weights):
+            arrays[f"layer{len(spec['layers'])}_w{j}"] = np.asarray(weight, dtype=np.float32)
+        spec['layers'].append(entry)
+
+    np.savez(output_path, spec=np.array(json.dumps(spec)), **arrays)
+    return output_path
+
+
+def export_serving_model(model, output_path=SERVING_MODEL_PATH, numpy_path=NUMPY_MODEL_PATH):
+    """Build, verify and save the serving model for a trained model"""
+    print("\n🔧 Exporting inference-optimized model...")
+    serving_model, summary = build_serving_model(model)
+    report = verify_serving_model(model, serving_model)
+    serving_model.save(output_path)
+
+    if numpy_path:
+        export_numpy_model(serving_model, numpy_path)
+        images = np.random.default_rng(0).integers(
+            0, 256, (4,) + tuple(model.input_shape[1:]), dtype=np.uint8
+        )
+        reference = np.asarray(serving_model(images.astype(np.float32), training=False))
+        numpy_diff = float(np.max(np.abs(NumpyBackend(numpy_path).predict(images) - reference)))
+        report['numpy_max_abs_diff'] = numpy_diff
+
+    print(f"   Removed: {', '.join(summary['removed']) or 'none'}")
+    print(f"   Fused rescaling: {', '.join(summary['fused_rescaling']) or 'none'}")
+    print(f"   Folded BatchNorm: {', '.join(summary['folded_batch_norm']) or 'none'}")
+    print(f"   Kept BatchNorm (zero scale): "
+          f"{', '.join(summary['kept_batch_norm']) or 'none'}")
+    print(f"   Parameters: {report['original_params']:,} -> {report['serving_params']:,}")
+    print(f"   Max output difference: {report['max_abs_diff']:.2e}")
+    print(f"   Latency: {report['original_ms_per_image']:.2f} ms -> "
+          f"{report['serving_ms_per_image']:.2f} ms per image")
+    print(f"✅ Serving model saved to: {output_path}")
+    if numpy_path:
+        print(f"✅ NumPy runtime model saved to: {numpy_path} "
+              f"(max difference {report['numpy_max_abs_diff']:.2e})")
+
+    report.update(summary)
+    return report
+
+
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else '../models/ad_quality_model_latest.keras'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else SERVING_MODEL_PATH
+    export_serving_model(keras.models.load_model(model_path), output_path)
@@ -4,55 +4,184 @@ Use trained model to predict ad quality and compliance
 """
 
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
 from PIL import Image
 import json
 import os
+import time
+import hashlib
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from backends import load_backend
+from prediction_cache import PredictionCache
+from profiling import PROFILE_DIR, TraceWindow
 
 class AdQualityPredictor:
-    def __init__(self, model_path='../models/ad_quality_model_latest.keras'):
-        """Initialize predictor with trained model"""
+    def __init__(self, model_path='../models/ad_quality_model_latest.keras',
+                 cache_size=4096, cache_path=None, fast_start=False, warm_up=False,
+                 backend='auto', metadata_path=None):
+        """Initialize predictor with trained model
+        
+        metadata_path defaults to model_metadata.json next to the model;
+        pass '' to load no metadata.
+        backend selects the runtime ('keras', 'tflite' or 'numpy'); 'auto'
+        picks it from the model file extension (see backends.py).
+        cache_size bounds the in-memory prediction cache (0 disables it);
+        cache_path optionally adds a persistent SQLite tier on disk.
+        fast_start (keras backend) traces a serving function with a fixed
+        input signature at load time and calls it directly instead of model.predict; warm_up
+        runs one dummy batch so the first real request pays no setup cost.
+        """
         self.model_path = model_path
-        self.model = None
+        if metadata_path is None:
+            metadata_path = os.path.join(os.path.dirname(model_path), 'model_metadata.json')
+        self.metadata_path = metadata_path
+        self.backend_name = backend
+        self.backend = None
         self.metadata = None
+        self.model_id = None
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.cache = None
+        self.fast_start = fast_start
+        self.warm_up = warm_up
+        self.startup_timings = {}
+        self.trace_window = None
         self.load_model()
         
     def load_model(self):
         """Load trained model and metadata"""
         if os.path.exists(self.model_path):
             print(f"Loading model from {self.model_path}...")
-            self.model = keras.models.load_model(self.model_path)
-            print("✅ Model loaded successfully!")
+            self.backend = load_backend(self.model_path, self.backend_name, self.fast_start)
+            self.startup_timings = dict(self.backend.timings)
+            print(f"✅ Model loaded successfully! ({type(self.backend).__name__})")
             
             # Load metadata
-            metadata_path = '../models/model_metadata.json'
-            if os.path.exists(metadata_path):
-                with open(metadata_path, 'r') as f:
+            if self.metadata_path and os.path.exists(self.metadata_path):
+                with open(self.metadata_path, 'r') as f:
                     self.metadata = json.load(f)
                     print(f"✅ Metadata loaded")
+            
+            # A new model identity starts from an empty cache
+            self.model_id = self._model_identity()
+            if self.cache is not None:
+                self.cache.close()
+                self.cache = None
+            if self.cache_size or self.cache_path:
+                self.cache = PredictionCache(self.model_id, self.cache_size, self.cache_path)
+            
+            if self.warm_up:
+                self._run_warm_up()
         else:
             raise FileNotFoundError(f"Model not found at {self.model_path}")
     
+    def _run_warm_up(self):
+        """Run one dummy batch through the model and record its latency"""
+        dummy = np.zeros((1,) + tuple(self.backend.input_shape[1:]), dtype=np.uint8)
+        start = time.perf_counter()
+        self.backend.predict(dummy)
+        self.startup_timings['first_inference_seconds'] = time.perf_counter() - start
+    
+    def report_startup(self):
+        """Print the cold start breakdown"""
+        print("⏱️  Startup breakdown:")
+        for name in ('import_seconds', 'load_seconds', 'trace_seconds', 'first_inference_seconds'):
+            if name in self.startup_timings:
+                label = name.replace('_seconds', '').replace('_', ' ')
+                print(f"   {label:<16} {self.startup_timings[name] * 1000:8.1f} ms")
+    
+    def profile_batches(self, start=1, count=5, log_dir=os.path.join(PROFILE_DIR, 'inference')):
+        """Capture a TensorFlow profiler trace of forward passes start .. start+count-1
+        
+        Call close_profile() after the last batch in case the window is
+        still open.
+        """
+        self.trace_window = TraceWindow(log_dir, start, count)
+    
+    def close_profile(self):
+        if self.trace_window is not None:
+            self.trace_window.close()
+            self.trace_window = None
+    
+    def close(self):
+        """Close the prediction cache's disk tier and any open profiler trace"""
+        self.close_profile()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
+    def _model_identity(self):
+        """Model version/timestamp from metadata plus a digest of the model file"""
+        digest = hashlib.sha256()
+        with open(self.model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        metadata = self.metadata or {}
+        return '{}-{}-{}'.format(
+            metadata.get('model_version', 'unknown'),
+            metadata.get('timestamp', 'unknown'),
+            digest.hexdigest()[:16]
+        )
+    
     def preprocess_image(self, image_path):
         """Preprocess image for prediction"""
+        img_array = self.load_image(image_path)
+        img_array = np.expand_dims(img_array, 0)
+        return img_array
+    
+    def load_image(self, image_path):
+        """Decode and resize a single image to a (224, 224, 3) uint8 array"""
         img = Image.open(image_path)
         img = img.convert('RGB')
         img = img.resize((224, 224))
-        img_array = np.array(img)
-        img_array = np.expand_dims(img_array, 0)
-        return img_array
+        return np.array(img)
     
     def predict(self, image_path):
         """Predict quality score and compliance"""
-        # Preprocess
-        img_array = self.preprocess_image(image_path)
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+        
+        # Identical creative bytes reuse the cached result
+        img_array, cache_key, cached = self.decode_image_bytes(image_bytes)
+        if cached is not None:
+            return cached
         
         # Predict
-        predictions = self.model.predict(img_array, verbose=0)
+        return self.predict_arrays(np.expand_dims(img_array, 0), [cache_key])[0]
+    
+    def decode_image_bytes(self, image_bytes):
+        """Decode raw image bytes unless their result is already cached
         
-        quality_score = float(predictions[0][0])
-        compliance_prob = float(predictions[0][1])
+        Returns (array, cache_key, cached_result); array is None on a cache hit.
+        """
+        cache_key = PredictionCache.key_for(image_bytes)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return None, cache_key, cached
+        return self.load_image(BytesIO(image_bytes)), cache_key, None
+    
+    def predict_arrays(self, images, cache_keys=None):
+        """Score a stacked (N, 224, 224, 3) uint8 batch in one forward pass"""
+        first_call = 'first_inference_seconds' not in self.startup_timings
+        if self.trace_window is not None:
+            self.trace_window.step()
+        start = time.perf_counter()
+        predictions = self.backend.predict(images)
+        if first_call:
+            self.startup_timings['first_inference_seconds'] = time.perf_counter() - start
+        results = [self._format_prediction(prediction) for prediction in predictions]
+        if self.cache is not None and cache_keys is not None:
+            self.cache.put_many(list(zip(cache_keys, results)))
+        return results
+    
+    def _format_prediction(self, prediction):
+        """Convert one raw model output row into a result dict"""
+        quality_score = float(prediction[0])
+        compliance_prob = float(prediction[1])
         
         # Ensure quality score is in valid range
         quality_score = max(0, min(100, quality_score))
@@ -84,19 +213,97 @@ class AdQualityPredictor:
         else:
             return 'F'
     
-    def batch_predict(self, image_paths):
-        """Predict for multiple images"""
-        results = []
-        for path in image_paths:
+    def batch_predict(self, image_paths, batch_size=32, num_workers=4, prefetch_batches=2):
+        """Predict for multiple images, one forward pass per chunk of batch_size"""
+        return list(self.iter_predict(image_paths, batch_size, num_workers, prefetch_batches))
+    
+    def iter_predict(self, image_paths, batch_size=32, num_workers=4, prefetch_batches=2):
+        """Yield results in input order while a thread pool decodes ahead of the model
+        
+        image_paths may be any iterable (it is consumed lazily). Up to
+        prefetch_batches chunks beyond the one being scored are decoded by
+        num_workers threads, so PIL decode/resize overlaps the forward pass.
+        num_workers=0 decodes each chunk on the calling thread instead.
+        """
+        for chunk, decoded in self._prefetch_chunks(image_paths, batch_size,
+                                                    num_workers, prefetch_batches):
+            yield from self._predict_chunk(chunk, decoded)
+    
+    def _prefetch_chunks(self, image_paths, batch_size, num_workers, prefetch_batches):
+        """Producer side of the pipeline: a bounded queue of chunks being decoded"""
+        paths = iter(image_paths)
+        if num_workers == 0:
+            while True:
+                chunk = list(islice(paths, batch_size))
+                if not chunk:
+                    return
+                yield chunk, [self._safe_load_image(p) for p in chunk]
+        
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=max(1, num_workers))
+        try:
+            while True:
+                # Top up the queue: the current chunk plus prefetch_batches ahead
+                while len(pending) <= prefetch_batches:
+                    chunk = list(islice(paths, batch_size))
+                    if not chunk:
+                        break
+                    pending.append((chunk, [pool.submit(self._safe_load_image, p) for p in chunk]))
+                
+                if not pending:
+                    return
+                
+                chunk, futures = pending.popleft()
+                yield chunk, [f.result() for f in futures]
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _safe_load_image(self, image_path):
+        """Read and decode one image unless its result is already cached
+        
+        Returns (array, error, cache_key, cached_result); exactly one of
+        array, error and cached_result is set.
+        """
+        try:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+            img_array, cache_key, cached = self.decode_image_bytes(image_bytes)
+            return img_array, None, cache_key, cached
+        except Exception as e:
+            return None, str(e), None, None
+    
+    def _predict_chunk(self, image_paths, decoded):
+        """Run a single batched forward pass over a decoded chunk and map results back"""
+        results = [None] * len(image_paths)
+        images = []
+        positions = []
+        keys = []
+        
+        # A bad image only fails its own entry; cache hits skip the model
+        for i, (path, (img_array, error, cache_key, cached)) in enumerate(zip(image_paths, decoded)):
+            if cached is not None:
+                cached['image_path'] = path
+                results[i] = cached
+            elif error is None:
+                images.append(img_array)
+                positions.append(i)
+                keys.append(cache_key)
+            else:
+                results[i] = {'image_path': path, 'error': error}
+        
+        if images:
             try:
-                result = self.predict(path)
-                result['image_path'] = path
-                results.append(result)
+                predictions = self.predict_arrays(np.stack(images), keys)
             except Exception as e:
-                results.append({
-                    'image_path': path,
-                    'error': str(e)
-                })
+                for i in positions:
+                    results[i] = {'image_path': image_paths[i], 'error': str(e)}
+                return results
+            
+            for i, result in zip(positions, predictions):
+                result = dict(result)
+                result['image_path'] = image_paths[i]
+                results[i] = result
+        
         return results
 
 def demo_inference():
@@ -148,6 +355,9 @@ def demo_inference():
         else:
             print(f"\n❌ Error processing {result['image_path']}: {result['error']}")
     
+    print()
+    predictor.report_startup()
+    
     print("\n" + "="*60)
     print("✅ Inference complete!")
     print("="*60)
@@ -0,0 +1,105 @@
+"""
+Multi-Worker Training Launcher
+Starts train_ad_quality_model.py --distributed with a TF_CONFIG per worker
+
+Local testing, N workers on this machine (worker 0 is the chief):
+  python launch_distributed.py --workers 2
+
+Production, one command per host with the same --hosts list:
+  python launch_distributed.py --hosts host1:12345,host2:12345 --task-index 0
+  python launch_distributed.py --hosts host1:12345,host2:12345 --task-index 1
+
+Arguments after -- are passed through to the training script.
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import subprocess
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train_ad_quality_model.py')
+LOG_DIR = '../logs'
+
+
+def free_ports(n):
+    """n currently unused local TCP ports"""
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind(('localhost', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def tf_config(hosts, task_index):
+    return json.dumps({
+        'cluster': {'worker': hosts},
+        'task': {'type': 'worker', 'index': task_index}
+    })
+
+
+def worker_command(train_args):
+    return [sys.executable, TRAIN_SCRIPT, '--distributed'] + train_args
+
+
+def launch_local(n_workers, train_args, cpus_per_worker=None):
+    """Run n_workers processes on this machine; returns the chief's exit code
+
+    Each worker's output goes to logs/worker_<i>.log. With cpus_per_worker
+    every worker's intra-op pool is limited so the workers do not
+    oversubscribe the cores.
+    """
+    hosts = [f'localhost:{port}' for port in free_ports(n_workers)]
+    if cpus_per_worker:
+        train_args = ['--intra-op-threads', str(cpus_per_worker)] + train_args
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    print(f"🚀 Launching {n_workers} local workers: {', '.join(hosts)}")
+    processes = []
+    for index in range(n_workers):
+        env = dict(os.environ, TF_CONFIG=tf_config(hosts, index))
+        log_path = os.path.join(LOG_DIR, f'worker_{index}.log')
+        log = open(log_path, 'w')
+        processes.append((subprocess.Popen(worker_command(train_args), env=env,
+                                           stdout=log, stderr=subprocess.STDOUT), log, log_path))
+
+    exit_codes = []
+    for index, (process, log, log_path) in enumerate(processes):
+        exit_codes.append(process.wait())
+        log.close()
+        status = '✅' if exit_codes[-1] == 0 else f'❌ exit code {exit_codes[-1]}'
+        print(f"   Worker {index}: {status} (log: {log_path})")
+
+    # A failed worker stalls the collectives; report it even if the chief exited cleanly
+    return next((code for code in exit_codes if code), 0)
+
+
+def launch_host(hosts, task_index, train_args):
+    """Run this host's worker in the foreground"""
+    env = dict(os.environ, TF_CONFIG=tf_config(hosts, task_index))
+    print(f"🚀 Worker {task_index} of {len(hosts)} ({hosts[task_index]})")
+    return subprocess.call(worker_command(train_args), env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Launch multi-worker data-parallel training")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--workers', type=int, help="number of local worker processes")
+    group.add_argument('--hosts', help="comma-separated host:port of every worker")
+    parser.add_argument('--task-index', type=int, default=0, help="this host's index in --hosts")
+    parser.add_argument('--cpus-per-worker', type=int, default=None,
+                        help="intra-op threads per local worker (default: TensorFlow's choice)")
+    args, train_args = parser.parse_known_args()
+    if train_args[:1] == ['--']:
+        train_args = train_args[1:]
+
+    if args.workers:
+        sys.exit(launch_local(args.workers, train_args, args.cpus_per_worker))
+    sys.exit(launch_host(args.hosts.split(','), args.task_index, train_args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Model Registry
+Tracks the timestamped ad_quality_model_*.keras artifacts in the models
+directory, loads versions in the background and swaps the active predictor
+atomically. Several versions can stay resident for shadow scoring.
+"""
+
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from inference import AdQualityPredictor
+
+# ad_quality_model_YYYYMMDD_HHMMSS.keras; the 'latest' alias is not a version
+VERSION_PATTERN = re.compile(r'^ad_quality_model_(\d{8}_\d{6})\.keras$')
+
+
+class ModelRegistry:
+    def __init__(self, models_dir='../models', **predictor_kwargs):
+        """predictor_kwargs are passed to every AdQualityPredictor the registry loads
+
+        A cache_path is suffixed with the version, giving each version its
+        own SQLite file; it is deleted when the version is unloaded.
+        """
+        self.models_dir = models_dir
+        self.predictor_kwargs = predictor_kwargs
+        self._resident = {}
+        self._active_version = None
+        self._lock = threading.Lock()
+        self._loader = ThreadPoolExecutor(max_workers=1)
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    def scan(self):
+        """Available versions (timestamps), oldest first"""
+        versions = []
+        for name in os.listdir(self.models_dir):
+            match = VERSION_PATTERN.match(name)
+            if match:
+                versions.append(match.group(1))
+        return sorted(versions)
+
+    def model_path(self, version):
+        return os.path.join(self.models_dir, f'ad_quality_model_{version}.keras')
+
+    def _cache_path(self, version):
+        """Per-version SQLite file, so versions never evict each other's disk cache"""
+        cache_path = self.predictor_kwargs.get('cache_path')
+        if not cache_path:
+            return cache_path
+        root, ext = os.path.splitext(cache_path)
+        return f'{root}_{version}{ext}'
+
+    def _metadata_path(self, version):
+        """Per-version metadata if present, else the shared file when it describes this version"""
+        versioned = os.path.join(self.models_dir, f'model_metadata_{version}.json')
+        if os.path.exists(versioned):
+            return versioned
+        shared = os.path.join(self.models_dir, 'model_metadata.json')
+        if os.path.exists(shared):
+            with open(shared, 'r') as f:
+                if json.load(f).get('timestamp') == version:
+                    return shared
+        return ''
+
+    def load(self, version):
+        """Load a version (if not already resident) and return its predictor"""
+        with self._lock:
+            if version in self._resident:
+                return self._resident[version]
+
+        kwargs = dict(self.predictor_kwargs, cache_path=self._cache_path(version))
+        predictor = AdQualityPredictor(
+            self.model_path(version),
+            metadata_path=self._metadata_path(version),
+            **kwargs
+        )
+        with self._lock:
+            resident = self._resident.setdefault(version, predictor)
+        if resident is not predictor:
+            # Another load of this version won the race; keep its predictor
+            predictor.close()
+        return resident
+
+    def load_async(self, version, activate=False):
+        """Load a version on the background loader thread; returns a Future"""
+        def task():
+            predictor = self.load(version)
+            if activate:
+                self.activate(version)
+            return predictor
+        return self._loader.submit(task)
+
+    def activate(self, version):
+        """Atomically make a resident version the one active() returns
+
+        Callers that already fetched the previous predictor keep using it,
+        so in-flight batches finish on the old version.
+        """
+        with self._lock:
+            if version not in self._resident:
+                raise KeyError(f"Version {version} is not loaded")
+            previous, self._active_version = self._active_version, version
+        if previous != version:
+            print(f"🔁 Active model: {previous} -> {version}")
+        return previous
+
+    def active(self):
+        """Predictor for the active version"""
+        with self._lock:
+            if self._active_version is None:
+                raise RuntimeError("No model version is active")
+            return self._resident[self._active_version]
+
+    @property
+    def active_version(self):
+        return self._active_version
+
+    def resident_versions(self):
+        with self._lock:
+            return sorted(self._resident)
+
+    def unload(self, version):
+        """Drop a resident version and its disk cache; the active one cannot be unloaded"""
+        with self._lock:
+            if version == self._active_version:
+                raise ValueError("Cannot unload the active version")
+            predictor = self._resident.pop(version, None)
+        if predictor is not None:
+            predictor.close()
+            cache_path = self._cache_path(version)
+            if cache_path and os.path.exists(cache_path):
+                os.remove(cache_path)
+
+    def load_latest(self):
+        """Load and activate the newest version synchronously"""
+        versions = self.scan()
+        if not versions:
+            raise FileNotFoundError(f"No ad_quality_model_*.keras versions in {self.models_dir}")
+        self.load(versions[-1])
+        self.activate(versions[-1])
+        return versions[-1]
+
+    def shadow_predict(self, image_paths, versions=None, **kwargs):
+        """Score the same images on several resident versions: {version: results}"""
+        image_paths = list(image_paths)
+        versions = versions or self.resident_versions()
+        return {
+            version: self.load(version).batch_predict(image_paths, **kwargs)
+            for version in versions
+        }
+
+    def watch(self, interval=30.0, keep=2):
+        """Poll for new versions; load them in the background and hot-swap
+
+        The last keep versions stay resident so the previous one is still
+        available for rollback or shadow scoring.
+        """
+        def poll():
+            while not self._stop_watching.wait(interval):
+                try:
+                    versions = self.scan()
+                    if versions and versions[-1] != self._active_version:
+                        self.load_async(versions[-1], activate=True).result()
+                        for version in self.resident_versions()[:-keep]:
+                            if version != self._active_version:
+                                self.unload(version)
+                except Exception as e:
+                    print(f"⚠️  Model watcher failed: {e}")
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=poll, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """Stop the watcher and the loader thread"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._loader.shutdown(wait=True)
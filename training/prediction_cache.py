@@ -0,0 +1,101 @@
+"""
+Prediction Cache
+Content-addressed cache of AdQualityPredictor results: an in-memory LRU with
+an optional SQLite tier on disk that survives restarts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, model_id, max_entries=4096, db_path=None):
+        """Create a cache for one model identity
+
+        Entries written by any other model identity are dropped from the
+        disk tier on open, so swapping the model invalidates the cache.
+        """
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db()
+
+    @staticmethod
+    def key_for(image_bytes):
+        """Content hash of the raw image bytes"""
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _open_db(self):
+        """Open the persistent tier and evict entries of other models"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS predictions ('
+            'model_id TEXT NOT NULL, digest TEXT NOT NULL, result TEXT NOT NULL, '
+            'PRIMARY KEY (model_id, digest))'
+        )
+        self._db.execute('DELETE FROM predictions WHERE model_id != ?', (self.model_id,))
+        self._db.commit()
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    'SELECT result FROM predictions WHERE model_id = ? AND digest = ?',
+                    (self.model_id, key)
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key, result):
+        """Store a single result"""
+        self.put_many([(key, result)])
+
+    def put_many(self, items):
+        """Store several (key, result) pairs with one disk commit"""
+        with self._lock:
+            for key, result in items:
+                self._remember(key, dict(result))
+            if self._db is not None and items:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO predictions (model_id, digest, result) VALUES (?, ?, ?)',
+                    [(self.model_id, key, json.dumps(result)) for key, result in items]
+                )
+                self._db.commit()
+
+    def _remember(self, key, result):
+        """Insert into the LRU, evicting the least recently used entries"""
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        """Close the disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -4,106 +4,388 @@ Downloads and prepares sample retail ad images for training
 """
 
 import os
+import json
 import requests
 from PIL import Image
 import numpy as np
+import time
+import hashlib
+import tempfile
+import threading
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def download_sample_images():
-    """Download sample retail images from free sources"""
+from sharded_dataset import TIERS, create_shard, shard_name, synthetic_compliance, write_index
+from dataset_manifest import DatasetManifest
+
+# Sample image URLs (using Unsplash placeholder service)
+# In real scenario, use actual retail ad dataset
+SAMPLE_IMAGE_URLS = {
+    'high_quality': [
+        'https://source.unsplash.com/random/400x400/?product,advertisement',
+        'https://source.unsplash.com/random/400x400/?retail,banner',
+        'https://source.unsplash.com/random/400x400/?shopping,poster',
+    ],
+    'medium_quality': [
+        'https://source.unsplash.com/random/400x400/?sale,flyer',
+        'https://source.unsplash.com/random/400x400/?discount,ad',
+    ],
+    'low_quality': [
+        'https://source.unsplash.com/random/400x400/?store,sign',
+    ]
+}
+
+CONTENT_TYPE_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp'}
+IMAGE_FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+def make_session(pool_size=8, retries=3, backoff=0.5):
+    """requests.Session with a connection pool of pool_size and retry with exponential backoff"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',)
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def download_sample_images(categories=SAMPLE_IMAGE_URLS, output_dir='../data/training_images',
+                           max_workers=8, retries=3, backoff=0.5, timeout=10, manifest=None):
+    """Download sample retail images from free sources
     
-    # Create directories
-    os.makedirs('../data/training_images/high_quality', exist_ok=True)
-    os.makedirs('../data/training_images/medium_quality', exist_ok=True)
-    os.makedirs('../data/training_images/low_quality', exist_ok=True)
+    categories maps a quality folder to its URLs. Up to max_workers
+    downloads run at once over one pooled session; failed requests are
+    retried with backoff. Bodies are streamed to disk as they arrive (no
+    decode/re-encode), checked to be an image (PIL verify; anything else,
+    e.g. an HTML error page, counts as failed) and stored as
+    <sha256 prefix><ext>, so identical content is kept once. URLs already
+    in the dataset manifest with an unchanged file are not fetched again.
+    Returns {quality: [saved paths]}.
+    """
     
     print("📥 Downloading sample retail ad images...")
     
-    # Sample image URLs (using Unsplash placeholder service)
-    # In real scenario, use actual retail ad dataset
-    categories = {
-        'high_quality': [
-            'https://source.unsplash.com/random/400x400/?product,advertisement',
-            'https://source.unsplash.com/random/400x400/?retail,banner',
-            'https://source.unsplash.com/random/400x400/?shopping,poster',
-        ],
-        'medium_quality': [
-            'https://source.unsplash.com/random/400x400/?sale,flyer',
-            'https://source.unsplash.com/random/400x400/?discount,ad',
-        ],
-        'low_quality': [
-            'https://source.unsplash.com/random/400x400/?store,sign',
-        ]
-    }
+    manifest = manifest or DatasetManifest()
+    manifest.prune()
+    downloaded_urls = {entry['url'] for entry in manifest.samples('download').values()}
     
+    jobs = []
     for quality, urls in categories.items():
-        print(f"\nDownloading {quality} images...")
-        for idx, url in enumerate(urls):
+        os.makedirs(os.path.join(output_dir, quality), exist_ok=True)
+        jobs.extend((quality, url) for url in urls if url not in downloaded_urls)
+    print(f"   {len(jobs)} new URLs ({sum(map(len, categories.values())) - len(jobs)} already in manifest)")
+    
+    session = make_session(max_workers, retries, backoff)
+    seen = manifest.digests()
+    seen_lock = threading.Lock()
+    saved = {quality: [] for quality in categories}
+    
+    def fetch(job):
+        quality, url = job
+        folder = os.path.join(output_dir, quality)
+        digest = hashlib.sha256()
+        # Stream to a temporary file while hashing, then name it by content;
+        # the partial file is removed if the transfer or the image check fails
+        part = tempfile.NamedTemporaryFile(dir=folder, suffix='.part', delete=False)
+        try:
+            with part, session.get(url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                for block in response.iter_content(chunk_size=64 * 1024):
+                    digest.update(block)
+                    part.write(block)
+            try:
+                with Image.open(part.name) as img:
+                    image_format = img.format
+                    img.verify()
+            except Exception as e:
+                raise ValueError(f"response is not a valid image ({content_type or 'no Content-Type'})") from e
+        except BaseException:
+            os.remove(part.name)
+            raise
+        
+        extension = IMAGE_FORMAT_EXTENSIONS.get(image_format,
+                                                CONTENT_TYPE_EXTENSIONS.get(content_type, '.jpg'))
+        name = digest.hexdigest()[:16] + extension
+        path = os.path.join(folder, name)
+        with seen_lock:
+            duplicate = digest.hexdigest() in seen or os.path.exists(path)
+            seen.add(digest.hexdigest())
+        if duplicate:
+            os.remove(part.name)
+        else:
+            os.replace(part.name, path)
+        return quality, url, path, duplicate, digest.hexdigest()
+    
+    start_time = time.perf_counter()
+    downloaded = duplicates = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch, job): job for job in jobs}
+        for future in as_completed(futures):
+            quality, url = futures[future]
             try:
-                response = requests.get(url, timeout=10)
-                img = Image.open(BytesIO(response.content))
-                img = img.resize((400, 400))
-                img.save(f'../data/training_images/{quality}/img_{idx}.jpg')
-                print(f"  ✓ Saved {quality}/img_{idx}.jpg")
+                quality, url, path, duplicate, sha256 = future.result()
             except Exception as e:
+                failed += 1
                 print(f"  ✗ Failed to download {url}: {e}")
+                continue
+            if duplicate:
+                duplicates += 1
+                print(f"  = Duplicate content from {url}, skipped")
+            else:
+                downloaded += 1
+                saved[quality].append(path)
+                manifest.record(path, quality.replace('_quality', ''), sha256=sha256,
+                                source='download', url=url)
+                print(f"  ✓ Saved {quality}/{os.path.basename(path)}")
+    session.close()
+    manifest.save()
     
-    print("\n✅ Sample images downloaded!")
+    elapsed = time.perf_counter() - start_time
+    print(f"\n✅ Sample images downloaded! {downloaded} saved, {duplicates} duplicates, "
+          f"{failed} failed in {elapsed:.1f}s")
+    return saved
 
-def create_synthetic_dataset(n_samples=200):
-    """Create synthetic ad images with different quality levels"""
+def create_synthetic_dataset(n_samples=200, shard_dir='../data/shards', shard_size=1024,
+                             image_size=(224, 224), seed=42, workers=None, manifest=None,
+                             block_size=None):
+    """Create synthetic ad images with different quality levels
+    
+    Besides the JPEGs, each image is resized to image_size once and written
+    to memory-mappable uint8 shards in shard_dir (see sharded_dataset.py)
+    together with its [quality_score, compliance] label, so training can
+    skip JPEG decoding. Pass shard_dir=None to write JPEGs only.
+    
+    Sample i is drawn from np.random.default_rng([seed, i]), so the output
+    is identical for any worker count. Samples are rendered in blocks of
+    block_size (default: about four blocks per worker, independent of
+    shard_size) by a pool of worker processes (default: all cores; 1
+    renders in-process), each writing its rows straight into the shards.
+    
+    Shards whose rows' JPEGs and shard file are recorded in the dataset
+    manifest with the same seed and are unchanged on disk are reused, not
+    re-rendered. Synthetic images and shards left over from runs with
+    another seed or more samples are deleted, so the manifest (and the
+    metadata counted from it) only describes the current dataset.
+    """
     
     print(f"\n🎨 Creating {n_samples} synthetic ad images...")
     
     os.makedirs('../data/synthetic_ads', exist_ok=True)
+    if shard_dir:
+        os.makedirs(shard_dir, exist_ok=True)
+    manifest = manifest or DatasetManifest()
+    manifest.prune()
+    workers = workers or os.cpu_count() or 1
+    image_shape = tuple(image_size) + (3,)
     
-    for i in range(n_samples):
-        # Determine quality level
-        quality_rand = np.random.rand()
-        
-        if quality_rand > 0.6:
-            quality = 'high'
-            base_color = np.random.randint(200, 255, 3)
-        elif quality_rand > 0.3:
-            quality = 'medium'
-            base_color = np.random.randint(100, 200, 3)
+    # Reuse is decided per shard-sized range of samples
+    by_index = {
+        entry['index']: (key, entry)
+        for key, entry in manifest.samples('synthetic').items() if entry.get('seed') == seed
+    }
+    ranges = [(start // shard_size, start, min(start + shard_size, n_samples))
+              for start in range(0, n_samples, shard_size)]
+    results, stale = [], []
+    for shard_id, start, stop in ranges:
+        result = _cached_range(manifest, by_index, shard_id, start, stop, seed, shard_dir,
+                               image_size)
+        if result is None:
+            stale.append((shard_id, start, stop))
         else:
-            quality = 'low'
-            base_color = np.random.randint(0, 100, 3)
-        
-        # Create image
-        img = np.ones((400, 400, 3), dtype=np.uint8) * base_color
-        
-        # Add patterns based on quality
-        if quality == 'high':
-            # Add structured elements (simulating good ad design)
-            for _ in range(5):
-                x, y = np.random.randint(0, 300, 2)
-                w, h = np.random.randint(50, 100, 2)
-                color = np.random.randint(150, 255, 3)
-                img[y:y+h, x:x+w] = color
-        
-        elif quality == 'medium':
-            # Add some elements
-            for _ in range(3):
-                x, y = np.random.randint(0, 350, 2)
-                w, h = np.random.randint(30, 60, 2)
-                color = np.random.randint(80, 200, 3)
-                img[y:y+h, x:x+w] = color
+            results.append(result)
+    if results:
+        print(f"  Reusing {sum(len(r['labels']) for r in results)} unchanged samples from the manifest")
+    
+    to_create = sum(stop - start for _, start, stop in stale)
+    block_size = block_size or max(1, -(-to_create // (4 * workers)))
+    shards = {}
+    blocks = []
+    for shard_id, start, stop in stale:
+        if shard_dir:
+            shards[shard_id] = create_shard(shard_dir, shard_id, start, stop - start, image_shape)
+        blocks += [(block_start, min(block_start + block_size, stop), seed, shard_dir,
+                    shard_size, image_size)
+                   for block_start in range(start, stop, block_size)]
+    start_time = time.perf_counter()
+    created = 0
+    
+    def report(result):
+        # Progress is aggregated in the parent as blocks finish, in any order
+        nonlocal created
+        results.append(result)
+        created += len(result['labels'])
+        rate = created / (time.perf_counter() - start_time)
+        print(f"  Created {created}/{to_create} images... ({rate:,.0f} images/sec)")
+        for file in result['files']:
+            manifest.record(file['path'], file['tier'], file['label'], file['sha256'],
+                            source='synthetic', index=file['index'], seed=seed)
+    
+    if workers == 1 or len(blocks) <= 1:
+        for block in blocks:
+            report(_render_block(block))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+            for future in as_completed([pool.submit(_render_block, block) for block in blocks]):
+                report(future.result())
+    
+    # Shards are complete once every block touching them has finished
+    for shard in shards.values():
+        manifest.record(os.path.join(shard_dir, shard['file']), source='shard',
+                        offset=shard['offset'], count=shard['count'],
+                        image_size=list(image_size), seed=seed)
+    removed = _remove_stale(manifest, n_samples, seed, shard_dir,
+                            [shard_id for shard_id, _, _ in ranges])
+    if removed:
+        print(f"  Removed {removed} file(s) left over from runs with other parameters")
+    manifest.save()
+    
+    print(f"✅ Synthetic dataset created in data/synthetic_ads/")
+    if shard_dir:
+        results.sort(key=lambda result: result['start'])
+        shard_entries = [shards[shard_id] if shard_id in shards else
+                         {'file': shard_name(shard_id), 'offset': start, 'count': stop - start}
+                         for shard_id, start, stop in ranges]
+        index = write_index(
+            shard_dir, image_shape, shard_size, shard_entries,
+            [label for result in results for label in result['labels']],
+            [tier for result in results for tier in result['tiers']]
+        )
+        print(f"📦 {index['n_samples']} samples in {len(index['shards'])} shard(s) at {shard_dir}")
+
+def _cached_range(manifest, by_index, shard_id, start, stop, seed, shard_dir, image_size):
+    """Labels and tiers for samples [start, stop) from the manifest, or None if any must be rebuilt"""
+    labels, tiers = [], []
+    for i in range(start, stop):
+        if i not in by_index:
+            return None
+        key, entry = by_index[i]
+        if not manifest.is_current(os.path.join(manifest.root, key), seed=seed):
+            return None
+        labels.append(entry['label'])
+        tiers.append(entry['tier'])
+    
+    if shard_dir and not manifest.is_current(os.path.join(shard_dir, shard_name(shard_id)),
+                                             seed=seed, offset=start, count=stop - start,
+                                             image_size=list(image_size)):
+        return None
+    return {'start': start, 'labels': labels, 'tiers': tiers, 'files': []}
+
+def _remove_stale(manifest, n_samples, seed, shard_dir, shard_ids):
+    """Delete synthetic samples and shards this run did not produce; returns how many
+    
+    Images from an earlier run with another seed or a larger n_samples, and
+    shards past the current ones, would otherwise still be counted in the
+    dataset metadata. Untracked shard files (e.g. from an interrupted run)
+    in shard_dir are deleted too.
+    """
+    stale = [key for key, entry in manifest.entries.items()
+             if entry.get('source') == 'synthetic'
+             and (entry.get('seed') != seed or entry.get('index', n_samples) >= n_samples)]
+    removed = manifest.remove(stale)
+    if shard_dir:
+        current = {manifest.key(os.path.join(shard_dir, shard_name(shard_id))) for shard_id in shard_ids}
+        removed += manifest.remove([key for key, entry in manifest.entries.items()
+                                    if entry.get('source') == 'shard' and key not in current])
+        for name in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, name)
+            if (name.startswith('shard_') and name.endswith('.npy')
+                    and manifest.key(path) not in current):
+                os.remove(path)
+                removed += 1
+    return removed
+
+def _render_block(block):
+    """Render and save samples [start, stop), writing their rows into the shards; runs in a worker"""
+    start, stop, seed, shard_dir, shard_size, image_size = block
+    resized = np.empty((stop - start,) + tuple(image_size) + (3,), dtype=np.uint8)
+    labels, tiers, files = [], [], []
+    for i in range(start, stop):
+        rng = np.random.default_rng([seed, i])
+        img, quality, label = _render_sample(rng)
         
-        # Save image
+        # Save image, hashing the encoded bytes for the manifest
         pil_img = Image.fromarray(img)
-        pil_img.save(f'../data/synthetic_ads/{quality}_{i:04d}.jpg')
+        encoded = BytesIO()
+        pil_img.save(encoded, format='JPEG')
+        path = f'../data/synthetic_ads/{quality}_{i:04d}.jpg'
+        with open(path, 'wb') as f:
+            f.write(encoded.getbuffer())
         
-        if (i + 1) % 50 == 0:
-            print(f"  Created {i + 1}/{n_samples} images...")
+        resized[i - start] = np.asarray(pil_img.resize(image_size))
+        labels.append(label)
+        tiers.append(quality)
+        files.append({'path': path, 'tier': quality, 'label': label, 'index': i,
+                      'sha256': hashlib.sha256(encoded.getbuffer()).hexdigest()})
     
-    print(f"✅ Synthetic dataset created in data/synthetic_ads/")
+    if shard_dir:
+        # Blocks never straddle shards; write this block's rows in place
+        offset = start // shard_size * shard_size
+        shard = np.load(os.path.join(shard_dir, shard_name(start // shard_size)), mmap_mode='r+')
+        shard[start - offset:stop - offset] = resized
+        shard.flush()
+        del shard
+    return {'start': start, 'labels': labels, 'tiers': tiers, 'files': files}
+
+def _render_sample(rng):
+    """One 400x400 synthetic ad: (image, quality tier, [quality_score, compliance])"""
+    # Determine quality level
+    quality_rand = rng.random()
+    
+    if quality_rand > 0.6:
+        quality = 'high'
+        base_color = rng.integers(200, 255, 3)
+    elif quality_rand > 0.3:
+        quality = 'medium'
+        base_color = rng.integers(100, 200, 3)
+    else:
+        quality = 'low'
+        base_color = rng.integers(0, 100, 3)
+    
+    # Create image
+    img = np.empty((400, 400, 3), dtype=np.uint8)
+    img[:] = base_color
+    
+    # Add patterns based on quality
+    if quality == 'high':
+        # Add structured elements (simulating good ad design)
+        for _ in range(5):
+            x, y = rng.integers(0, 300, 2)
+            w, h = rng.integers(50, 100, 2)
+            color = rng.integers(150, 255, 3)
+            img[y:y+h, x:x+w] = color
+    
+    elif quality == 'medium':
+        # Add some elements
+        for _ in range(3):
+            x, y = rng.integers(0, 350, 2)
+            w, h = rng.integers(30, 60, 2)
+            color = rng.integers(80, 200, 3)
+            img[y:y+h, x:x+w] = color
+    
+    return img, quality, _synthetic_label(rng, quality)
 
-def create_metadata():
-    """Create dataset metadata"""
+def _synthetic_label(rng, quality):
+    """[quality_score, compliance] drawn from the tier ranges in the dataset metadata"""
+    if quality == 'high':
+        score = rng.uniform(70, 100)
+    elif quality == 'medium':
+        score = rng.uniform(40, 70)
+    else:
+        score = rng.uniform(0, 40)
+    return [float(score), float(synthetic_compliance(TIERS.index(quality), score))]
+
+def create_metadata(manifest=None):
+    """Create dataset metadata with counts taken from the dataset manifest"""
     
-    import json
+    manifest = manifest or DatasetManifest()
+    manifest.prune()
+    counts = manifest.counts()
     
     metadata = {
         "dataset_name": "RetailSync Ad Quality Dataset",
@@ -111,22 +393,27 @@ def create_metadata():
         "description": "Synthetic dataset for training ad quality and compliance models",
         "categories": {
             "high_quality": {
+                "count": counts['tiers'].get('high', 0),
                 "score_range": "70-100",
                 "compliance": "Pass",
                 "characteristics": "Clear structure, good contrast, professional design"
             },
             "medium_quality": {
+                "count": counts['tiers'].get('medium', 0),
                 "score_range": "40-70",
                 "compliance": "Conditional",
                 "characteristics": "Adequate design, some issues"
             },
             "low_quality": {
+                "count": counts['tiers'].get('low', 0),
                 "score_range": "0-40",
                 "compliance": "Fail",
                 "characteristics": "Poor design, low contrast, unclear"
             }
         },
-        "total_samples": 200,
+        "total_samples": counts['total_samples'],
+        "sources": counts['sources'],
+        "manifest": os.path.basename(manifest.path),
         "image_format": "JPG",
         "image_size": "400x400"
     }
@@ -141,18 +428,20 @@ if __name__ == "__main__":
     print("RetailSync AI - Data Preparation")
     print("="*60)
     
+    manifest = DatasetManifest()
+    
     # Option 1: Create synthetic dataset (fast, no internet needed)
-    create_synthetic_dataset(n_samples=200)
+    create_synthetic_dataset(n_samples=200, manifest=manifest)
     
     # Option 2: Download sample images (requires internet)
     # Uncomment to use:
     # try:
-    #     download_sample_images()
+    #     download_sample_images(manifest=manifest)
     # except Exception as e:
     #     print(f"⚠️  Download failed: {e}")
     #     print("Using synthetic data only")
     
-    create_metadata()
+    create_metadata(manifest)
     
     print("\n" + "="*60)
     print("✅ Data preparation complete!")
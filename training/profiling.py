@@ -0,0 +1,185 @@
+"""
+Profiling
+Opt-in captures for diagnosing slow training or inference runs:
+
+- A TensorFlow profiler trace of a window of training steps or inference
+  batches (open the directory in TensorBoard's Profile tab).
+- A cProfile capture of Python code, e.g. NumPy data generation or PIL
+  decoding. On Python 3.8-3.11 it also covers threads started while it
+  runs; from 3.12 cProfile is built on sys.monitoring, which allows one
+  active profiler per process, so only the calling thread is profiled.
+  Work on threads it cannot see (tf.data map functions, or any thread on
+  3.12+) can be profiled call by call with CallProfile instead.
+  Either is written as a .prof file (for snakeviz / pstats) with a text
+  summary of the top hotspots next to it.
+
+Everything is written under ../logs/profile.
+"""
+
+import os
+import sys
+import io
+import cProfile
+import pstats
+import threading
+import functools
+from contextlib import contextmanager
+
+PROFILE_DIR = '../logs/profile'
+# Whether python_profile also covers threads started inside it
+THREADS_PROFILED = sys.version_info < (3, 12)
+
+
+class TraceWindow:
+    def __init__(self, log_dir, start, count):
+        """TensorFlow profiler trace of units start .. start+count-1 (0-based)
+
+        Call step() before every unit (train step, inference batch) and
+        close() when done; tracing starts and stops on its own.
+        """
+        self.log_dir = log_dir
+        self.start = start
+        self.stop_at = start + count
+        self.seen = 0
+        self.active = False
+
+    def step(self):
+        if self.seen == self.start and not self.active:
+            import tensorflow as tf
+            os.makedirs(self.log_dir, exist_ok=True)
+            tf.profiler.experimental.start(self.log_dir)
+            self.active = True
+        elif self.seen == self.stop_at:
+            self.close()
+        self.seen += 1
+
+    def close(self):
+        if self.active:
+            import tensorflow as tf
+            tf.profiler.experimental.stop()
+            self.active = False
+            print(f"🔬 Profiler trace of {self.seen - self.start} steps saved to: {self.log_dir}")
+
+
+def trace_callback(log_dir, start_step, num_steps):
+    """Keras callback tracing train steps start_step .. start_step+num_steps-1 of the run"""
+    from tensorflow import keras
+
+    window = TraceWindow(log_dir, start_step, num_steps)
+    return keras.callbacks.LambdaCallback(
+        on_train_batch_begin=lambda batch, logs: window.step(),
+        on_train_end=lambda logs: window.close()
+    )
+
+
+def write_hotspots(stats, path, top=25):
+    """Write the top functions by cumulative and by own time to path; returns the text"""
+    out = io.StringIO()
+    stats.stream = out
+    out.write("Top functions by cumulative time\n")
+    stats.sort_stats('cumulative').print_stats(top)
+    out.write("\nTop functions by own time\n")
+    stats.sort_stats('tottime').print_stats(top)
+    with open(path, 'w') as f:
+        f.write(out.getvalue())
+    return out.getvalue()
+
+
+def save_profile(stats, name, log_dir, top, scope):
+    """Dump stats to log_dir/<name>.prof plus a hotspot summary and print the top entries"""
+    os.makedirs(log_dir, exist_ok=True)
+    prof_path = os.path.join(log_dir, f'{name}.prof')
+    summary_path = os.path.join(log_dir, f'{name}_hotspots.txt')
+    stats.dump_stats(prof_path)
+    write_hotspots(stats, summary_path, top)
+
+    print(f"\n🔬 Python profile '{name}' ({scope}): {prof_path}")
+    print(f"   Top hotspots by own time (full summary: {summary_path}):")
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    for (filename, line, function), (_, calls, own, cumulative, _) in entries[:5]:
+        print(f"   {own:8.3f}s own {cumulative:8.3f}s cum {calls:8d} calls  "
+              f"{function} ({os.path.basename(filename)}:{line})")
+
+
+@contextmanager
+def python_profile(name, log_dir=PROFILE_DIR, top=25):
+    """cProfile the enclosed block, plus threads it starts, into log_dir/<name>.prof
+
+    Threads are only included before Python 3.12 (see the module
+    docstring). A hotspot summary goes to log_dir/<name>_hotspots.txt and
+    the top few entries are printed.
+    """
+    profilers = []
+    lock = threading.Lock()
+    # A second cProfile.Profile cannot be enabled while one is active on 3.12+
+    per_thread = THREADS_PROFILED
+
+    def profile_thread(frame, event, arg):
+        # Runs once in each new thread: swap in that thread's own profiler
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        with lock:
+            profilers.append(profiler)
+        profiler.enable()
+
+    main_profiler = cProfile.Profile()
+    if per_thread:
+        threading.setprofile(profile_thread)
+    main_profiler.enable()
+    try:
+        yield
+    finally:
+        main_profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+
+        stats = pstats.Stats(main_profiler)
+        with lock:
+            for profiler in profilers:
+                try:
+                    stats.add(profiler)
+                except TypeError:
+                    pass  # thread exited before any profiled call
+        threads = f"{len(profilers)} worker threads" if per_thread else "calling thread only"
+        save_profile(stats, name, log_dir, top, threads)
+
+
+class CallProfile:
+    def __init__(self, name, log_dir=PROFILE_DIR, top=25):
+        """cProfile every call of wrapped functions, on any thread, into one profile
+
+        For work python_profile cannot see, such as tf.data map functions.
+        Profiled calls run one at a time (3.12+ allows a single active
+        profiler), so do not nest this inside python_profile. close()
+        writes log_dir/<name>.prof and its hotspot summary.
+        """
+        self.name = name
+        self.log_dir = log_dir
+        self.top = top
+        self.calls = 0
+        self.stats = None
+        self.lock = threading.Lock()
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            with self.lock:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profiler.disable()
+                    self.calls += 1
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profiler)
+                    else:
+                        self.stats.add(profiler)
+        return profiled
+
+    def close(self):
+        with self.lock:
+            if self.stats is not None:
+                save_profile(self.stats, self.name, self.log_dir, self.top,
+                             f"{self.calls} profiled calls")
+                self.stats = None
@@ -0,0 +1,138 @@
+"""
+Post-Training Quantization
+Emits float32, float16 and int8 TFLite variants of the serving model and a
+report comparing each against the float Keras model
+
+Usage:
+  python quantize_model.py [model_path]
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from export_serving_model import build_serving_model
+from backends import TFLiteBackend
+
+QUANTIZED_DIR = '../models'
+REPORT_PATH = '../logs/quantization_report.json'
+
+
+def convert_variant(serving_model, variant, calibration_images=None):
+    """Convert the serving model to a TFLite flatbuffer for one variant"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(serving_model)
+
+    if variant == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == 'int8':
+        def representative_dataset():
+            for img in calibration_images:
+                yield [np.expand_dims(img, 0).astype(np.float32)]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+    elif variant != 'float32':
+        raise ValueError(f"Unknown variant: {variant}")
+
+    return converter.convert()
+
+
+def _tensor_memory_bytes(tflite_model):
+    """Bytes held by all interpreter tensors for one image (weights + activations)"""
+    total = 0
+    for detail in tflite_model.interpreter.get_tensor_details():
+        total += int(np.prod(detail['shape'])) * np.dtype(detail['dtype']).itemsize
+    return total
+
+
+def evaluate_variant(model_path, eval_images, reference):
+    """Agreement with the float model plus per-image latency and memory"""
+    tflite_model = TFLiteBackend(model_path)
+    predictions = np.concatenate([
+        tflite_model.predict(img[np.newaxis]) for img in eval_images
+    ])
+
+    timings = []
+    for img in eval_images:
+        start = time.perf_counter()
+        tflite_model.predict(img[np.newaxis])
+        timings.append(time.perf_counter() - start)
+
+    reference_pass = reference[:, 1] > 0.5
+    return {
+        'path': model_path,
+        'size_mb': round(os.path.getsize(model_path) / 1e6, 3),
+        'tensor_memory_mb_per_image': round(_tensor_memory_bytes(tflite_model) / 1e6, 3),
+        'latency_ms_per_image': round(float(np.median(timings)) * 1000, 3),
+        'quality_mae_vs_float': round(float(np.mean(np.abs(predictions[:, 0] - reference[:, 0]))), 4),
+        'compliance_agreement': round(float(np.mean((predictions[:, 1] > 0.5) == reference_pass)), 4),
+    }
+
+
+def quantize_model(model, calibration_images, eval_images=None, output_dir=QUANTIZED_DIR,
+                   variants=('float32', 'float16', 'int8'), serving_model=None):
+    """Write each TFLite variant and a comparison report; returns the report
+
+    calibration_images should be a sample of the training data (uint8,
+    N x H x W x 3); it drives int8 activation ranges. eval_images default
+    to the same sample. serving_model is the already exported serving
+    model of model, if any; otherwise it is built here.
+    """
+    print("\n🗜️  Quantizing model for CPU serving...")
+    eval_images = calibration_images if eval_images is None else eval_images
+    if serving_model is None:
+        serving_model, _ = build_serving_model(model)
+
+    # Float Keras model is the reference for both accuracy and latency
+    reference = np.asarray(model.predict(eval_images, verbose=0))
+    timings = []
+    for img in eval_images:
+        start = time.perf_counter()
+        model(img[np.newaxis].astype(np.float32), training=False)
+        timings.append(time.perf_counter() - start)
+
+    report = {
+        'calibration_samples': len(calibration_images),
+        'eval_samples': len(eval_images),
+        'keras_float32': {
+            'size_mb': round(model.count_params() * 4 / 1e6, 3),
+            'latency_ms_per_image': round(float(np.median(timings)) * 1000, 3),
+        },
+        'variants': {}
+    }
+
+    for variant in variants:
+        path = os.path.join(output_dir, f'ad_quality_model_{variant}.tflite')
+        with open(path, 'wb') as f:
+            f.write(convert_variant(serving_model, variant, calibration_images))
+        report['variants'][variant] = evaluate_variant(path, eval_images, reference)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    # 'mem MB' is tensor_memory_mb_per_image; the Keras model has no interpreter to measure
+    print(f"   {'variant':<10}{'size MB':>9}{'mem MB':>9}{'ms/img':>9}{'MAE':>9}{'agree':>8}")
+    keras_stats = report['keras_float32']
+    print(f"   {'keras':<10}{keras_stats['size_mb']:>9.2f}{'-':>9}"
+          f"{keras_stats['latency_ms_per_image']:>9.2f}{0:>9.3f}{1:>8.1%}")
+    for variant, stats in report['variants'].items():
+        print(f"   {variant:<10}{stats['size_mb']:>9.2f}{stats['tensor_memory_mb_per_image']:>9.2f}"
+              f"{stats['latency_ms_per_image']:>9.2f}"
+              f"{stats['quality_mae_vs_float']:>9.3f}{stats['compliance_agreement']:>8.1%}")
+    print(f"📝 Quantization report saved to: {REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    from train_ad_quality_model import AdQualityTrainer, CONFIG
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else '../models/ad_quality_model_latest.keras'
+    model = keras.models.load_model(model_path)
+    calibration_images, _ = AdQualityTrainer(CONFIG).generate_synthetic_data(n_samples=200)
+    quantize_model(model, calibration_images)
@@ -0,0 +1,329 @@
+"""
+Local Scoring Service
+Keeps one warm AdQualityPredictor in a long-running asyncio HTTP server and
+groups concurrent requests into micro-batches
+
+Endpoints:
+  POST /predict        raw image bytes, or JSON {"image_path": "..."}
+  POST /predict_batch  JSON {"image_paths": ["...", ...]}
+  GET  /health         model identity and batching statistics
+
+Image paths are only served from inside --image-root (without it, only
+uploaded bytes are accepted), and CORS is only granted to --cors-origin.
+
+With --watch-models the service follows new ad_quality_model_*.keras
+versions through ModelRegistry and hot-swaps without a restart.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from inference import AdQualityPredictor
+from model_registry import ModelRegistry
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class MicroBatcher:
+    def __init__(self, get_predictor, max_batch_size=32, max_wait_ms=5.0):
+        """Collect decoded images into batches for a single model thread
+        
+        get_predictor is called once per batch, so a model swap takes effect
+        between batches and never splits one.
+        """
+        self.get_predictor = get_predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        # One model thread: batches run in order while the event loop stays free
+        self.model_executor = ThreadPoolExecutor(max_workers=1)
+        self.batches_run = 0
+        self.images_scored = 0
+
+    async def submit(self, img_array, cache_key):
+        """Queue one decoded image and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((img_array, cache_key, future))
+        return await future
+
+    async def run(self):
+        """Flush a batch when it is full or the oldest request has waited max_wait_ms"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            images = np.stack([item[0] for item in batch])
+            cache_keys = [item[1] for item in batch]
+            try:
+                predictor = self.get_predictor()
+                results = await loop.run_in_executor(
+                    self.model_executor, predictor.predict_arrays, images, cache_keys
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.images_scored += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class ScoringServer:
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=5.0, decode_workers=4,
+                 image_root=None, cors_origin=None):
+        """HTTP front end around a MicroBatcher
+        
+        predictor is an AdQualityPredictor or a ModelRegistry, in which case
+        requests go to whichever version is active. image_path requests may
+        only read files under image_root (none at all when it is None);
+        cors_origin is the one browser origin allowed to call the service.
+        """
+        if isinstance(predictor, ModelRegistry):
+            self.get_predictor = predictor.active
+        else:
+            self.get_predictor = lambda: predictor
+        self.batcher = MicroBatcher(self.get_predictor, max_batch_size, max_wait_ms)
+        self.decode_executor = ThreadPoolExecutor(max_workers=decode_workers)
+        self.image_root = os.path.realpath(image_root) if image_root else None
+        self.cors_origin = cors_origin
+        self.started = time.time()
+
+    async def score_bytes(self, image_bytes):
+        """Decode off the event loop, then score through the micro-batcher"""
+        loop = asyncio.get_running_loop()
+        try:
+            img_array, cache_key, cached = await loop.run_in_executor(
+                self.decode_executor, self.get_predictor().decode_image_bytes, image_bytes
+            )
+        except (OSError, Image.DecompressionBombError) as e:
+            # Undecodable bytes are the client's error, not the server's
+            raise ValueError(f'Cannot decode image: {e}')
+        if cached is not None:
+            return cached
+        return await self.batcher.submit(img_array, cache_key)
+
+    def resolve_image_path(self, image_path):
+        """Real path of image_path (relative to image_root); PermissionError outside it"""
+        if self.image_root is None:
+            raise PermissionError('image_path requests are disabled (see --image-root)')
+        path = os.path.realpath(os.path.join(self.image_root, image_path))
+        if os.path.commonpath([path, self.image_root]) != self.image_root:
+            raise PermissionError(f'image_path is outside the image root: {image_path}')
+        return path
+
+    async def score_path(self, image_path):
+        """Score an image file under image_root"""
+        loop = asyncio.get_running_loop()
+        image_bytes = await loop.run_in_executor(
+            self.decode_executor, _read_file, self.resolve_image_path(image_path)
+        )
+        result = await self.score_bytes(image_bytes)
+        result['image_path'] = image_path
+        return result
+
+    async def score_path_safe(self, image_path):
+        """score_path that reports a failure in the result instead of raising"""
+        try:
+            return await self.score_path(image_path)
+        except Exception as e:
+            return {'image_path': image_path, 'error': str(e)}
+
+    async def handle_request(self, method, path, headers, body):
+        """Route one request; returns (status, payload)"""
+        if method == 'OPTIONS':
+            return 204, None
+
+        if method == 'GET' and path == '/health':
+            predictor = self.get_predictor()
+            cache = predictor.cache
+            return 200, {
+                'status': 'ok',
+                'model_id': predictor.model_id,
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'batches_run': self.batcher.batches_run,
+                'images_scored': self.batcher.images_scored,
+                'queue_depth': self.batcher.queue.qsize(),
+                'cache_hits': cache.hits if cache is not None else 0,
+                'cache_misses': cache.misses if cache is not None else 0,
+            }
+
+        if method == 'POST' and path == '/predict':
+            if headers.get('content-type', '').startswith('application/json'):
+                request = json.loads(body)
+                return 200, await self.score_path(request['image_path'])
+            return 200, await self.score_bytes(body)
+
+        if method == 'POST' and path == '/predict_batch':
+            request = json.loads(body)
+            results = await asyncio.gather(
+                *(self.score_path_safe(p) for p in request['image_paths'])
+            )
+            return 200, {'results': results}
+
+        return 404, {'error': f'No route for {method} {path}'}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.handle_request(
+                        method.upper(), target.split('?', 1)[0], headers, body
+                    )
+                except (ValueError, KeyError) as e:
+                    status, payload = 400, {'error': str(e)}
+                except PermissionError as e:
+                    status, payload = 403, {'error': str(e)}
+                except FileNotFoundError as e:
+                    status, payload = 404, {'error': 'No such image'}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        """Write a JSON response; CORS headers only name the configured origin"""
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        head = [
+            f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}',
+            'Content-Type: application/json',
+            f'Content-Length: {len(body)}',
+        ]
+        if self.cors_origin:
+            head += [
+                f'Access-Control-Allow-Origin: {self.cors_origin}',
+                'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers: Content-Type',
+            ]
+        head.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        """Run the batcher and the HTTP listener until cancelled"""
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚀 Scoring service listening on http://{host}:{port}")
+        print(f"   Micro-batching: up to {self.batcher.max_batch_size} images "
+              f"or {self.batcher.max_wait * 1000:.1f} ms")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+
+
+def _read_file(path):
+    """Read a whole file as bytes"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RetailSync AI local scoring service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model', default='../models/ad_quality_model_latest.keras')
+    parser.add_argument('--backend', default='auto', choices=['auto', 'keras', 'tflite', 'numpy'],
+                        help='Inference runtime (auto picks it from the model file extension)')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help='Longest a request waits for its batch to fill')
+    parser.add_argument('--decode-workers', type=int, default=4)
+    parser.add_argument('--image-root', default=None,
+                        help='Directory image_path requests may read from '
+                             '(default: accept uploaded image bytes only)')
+    parser.add_argument('--cors-origin', default=None,
+                        help='Browser origin allowed to call the service, e.g. the web '
+                             'editor at http://localhost:3000 (default: none)')
+    parser.add_argument('--watch-models', type=float, default=0, metavar='SECONDS',
+                        help='Serve the newest timestamped model in the --model directory '
+                             'and poll for new versions every SECONDS')
+    parser.add_argument('--cache-path', default=None,
+                        help='Optional SQLite file for a persistent prediction cache')
+    parser.add_argument('--fast-start', action='store_true',
+                        help='Pre-trace a fixed-signature serving function at load time')
+    parser.add_argument('--warm-up', action='store_true',
+                        help='Run one dummy batch before serving')
+    args = parser.parse_args()
+
+    predictor_kwargs = dict(cache_path=args.cache_path, fast_start=args.fast_start,
+                            warm_up=args.warm_up, backend=args.backend)
+    if args.watch_models:
+        predictor = ModelRegistry(os.path.dirname(args.model), **predictor_kwargs)
+        predictor.load_latest()
+        predictor.active().report_startup()
+        predictor.watch(args.watch_models)
+    else:
+        predictor = AdQualityPredictor(args.model, **predictor_kwargs)
+        predictor.report_startup()
+    server = ScoringServer(predictor, args.max_batch_size, args.max_wait_ms, args.decode_workers,
+                           image_root=args.image_root, cors_origin=args.cors_origin)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Scoring service stopped")
+
+
+if __name__ == "__main__":
+    main()
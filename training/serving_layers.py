@@ -0,0 +1,37 @@
+"""
+Serving Layers
+Custom layers used by the inference-optimized model export
+Importing this module registers them so the serving model can be loaded
+"""
+
+from tensorflow import keras
+
+
+@keras.utils.register_keras_serializable(package='RetailSync')
+class ChannelOffset(keras.layers.Layer):
+    """Add a fixed per-channel offset
+
+    What is left of a BatchNormalization once its scale is folded into the
+    following 'same'-padded Conv2D (see export_serving_model._folded_conv).
+    """
+
+    def __init__(self, channels, **kwargs):
+        super().__init__(**kwargs)
+        self.channels = int(channels)
+
+    def build(self, input_shape):
+        self.offset = self.add_weight(
+            name='offset',
+            shape=(self.channels,),
+            initializer='zeros',
+            trainable=False
+        )
+        super().build(input_shape)
+
+    def call(self, inputs):
+        return inputs + self.offset
+
+    def get_config(self):
+        config = super().get_config()
+        config['channels'] = self.channels
+        return config
@@ -0,0 +1,210 @@
+"""
+Sharded Dataset
+Fixed-size, pre-resized uint8 image shards that can be memory-mapped
+
+Layout of a shard directory:
+  shard_00000.npy ...  (shard_size, H, W, 3) uint8 arrays; the last may be shorter
+  labels.npy           (N, 2) float32 [quality_score, compliance]
+  tiers.npy            (N,) uint8 quality tier (0 = low, 1 = medium, 2 = high)
+  index.json           image shape, shard files and the first sample index of each
+
+Images are decoded and resized once when the shards are written; readers
+memory-map the shards, so repeated runs and concurrent processes share the
+OS page cache instead of decoding JPEGs again.
+
+ArrayDataset exposes an in-memory array through the same index-based
+interface, and split_indices splits either kind without copying images.
+"""
+
+import os
+import json
+import numpy as np
+
+TIERS = ('low', 'medium', 'high')
+
+# Synthetic labels: a sample passes compliance when its quality score is
+# above its tier's threshold (low-tier samples never pass)
+COMPLIANCE_THRESHOLDS = (np.inf, 60.0, 75.0)
+
+
+def synthetic_compliance(tiers, scores):
+    """1.0/0.0 compliance for tier ids (0 low, 1 medium, 2 high) and quality scores"""
+    thresholds = np.take(COMPLIANCE_THRESHOLDS, tiers)
+    return (np.asarray(scores) > thresholds).astype(np.float32)
+
+
+def shard_name(shard_id):
+    return f'shard_{shard_id:05d}.npy'
+
+
+def create_shard(output_dir, shard_id, offset, count, image_shape):
+    """Preallocate one (count, H, W, 3) uint8 shard file; returns its index.json entry
+
+    Writers fill rows in place through np.load(path, mmap_mode='r+'), so
+    several processes can each write their own rows of the same shard.
+    """
+    path = os.path.join(output_dir, shard_name(shard_id))
+    np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8,
+                              shape=(count,) + tuple(image_shape)).flush()
+    return {'file': shard_name(shard_id), 'offset': offset, 'count': count}
+
+
+def write_index(output_dir, image_shape, shard_size, shards, labels, tiers):
+    """Write labels.npy, tiers.npy and index.json for shards created with create_shard"""
+    np.save(os.path.join(output_dir, 'labels.npy'),
+            np.asarray(labels, dtype=np.float32).reshape(-1, 2))
+    np.save(os.path.join(output_dir, 'tiers.npy'),
+            np.asarray([TIERS.index(tier) for tier in tiers], dtype=np.uint8))
+    index = {
+        'n_samples': len(labels),
+        'image_shape': list(image_shape),
+        'shard_size': shard_size,
+        'shards': sorted(shards, key=lambda shard: shard['offset'])
+    }
+    with open(os.path.join(output_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class IndexedDataset:
+    """Batching and tf.data helpers for an index-addressed (images, labels) source
+
+    Subclasses provide __len__, image_shape and get_batch(indices), which
+    returns the images and labels at a sorted array of indices.
+    """
+
+    def iter_batches(self, batch_size, indices=None):
+        """Yield (images, labels) for indices (default: all samples) in order"""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        for start in range(0, len(indices), batch_size):
+            yield self.get_batch(indices[start:start + batch_size])
+
+    def as_tf_dataset(self, batch_size, indices=None, shuffle=False, seed=None, epoch_fn=None):
+        """Batched tf.data pipeline gathering each batch lazily from the source
+
+        With shuffle the indices are permuted every epoch and each batch is
+        gathered in sorted order, so reads stay sequential. epoch_fn, if
+        given, returns the current epoch and the permutation is drawn from
+        default_rng([seed, epoch]), so a resumed run sees the same order.
+        """
+        import tensorflow as tf
+
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        rng = np.random.default_rng(seed)
+
+        def generate():
+            if not shuffle:
+                yield from self.iter_batches(batch_size, indices)
+                return
+            epoch_rng = rng if epoch_fn is None else np.random.default_rng([seed or 0, epoch_fn()])
+            order = epoch_rng.permutation(indices)
+            for start in range(0, len(order), batch_size):
+                yield self.get_batch(np.sort(order[start:start + batch_size]))
+
+        dataset = tf.data.Dataset.from_generator(
+            generate,
+            output_signature=(
+                tf.TensorSpec((None,) + self.image_shape, tf.uint8),
+                tf.TensorSpec((None, 2), tf.float32)
+            )
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+class ArrayDataset(IndexedDataset):
+    def __init__(self, images, labels, tiers):
+        """Wrap in-memory (N, H, W, 3) images, (N, 2) labels and (N,) tier ids without copying"""
+        self.images = images
+        self.labels = labels
+        self.tiers = np.asarray(tiers)
+        self.image_shape = tuple(images.shape[1:])
+
+    def __len__(self):
+        return len(self.images)
+
+    def get_batch(self, indices):
+        return self.images[indices], self.labels[indices]
+
+
+class ShardedDataset(IndexedDataset):
+    def __init__(self, shard_dir):
+        """Open a shard directory; image data stays on disk until it is touched"""
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, 'index.json'), 'r') as f:
+            self.index = json.load(f)
+        self.image_shape = tuple(self.index['image_shape'])
+        self.shard_size = self.index['shard_size']
+        self.shards = [np.load(os.path.join(shard_dir, shard['file']), mmap_mode='r')
+                       for shard in self.index['shards']]
+        self.labels = np.load(os.path.join(shard_dir, 'labels.npy'))
+        self.tiers = np.load(os.path.join(shard_dir, 'tiers.npy'))
+
+    def __len__(self):
+        return self.index['n_samples']
+
+    def get_batch(self, indices):
+        """Images and labels for sample indices
+
+        A run of consecutive indices inside one shard is returned as a view
+        of the memory map (no copy); anything else is gathered into a new array.
+        """
+        indices = np.asarray(indices)
+        shard_ids = indices // self.shard_size
+        local = indices - shard_ids * self.shard_size
+        if (len(indices) and shard_ids[0] == shard_ids[-1]
+                and np.array_equal(local, np.arange(local[0], local[0] + len(local)))):
+            images = self.shards[shard_ids[0]][local[0]:local[0] + len(local)]
+        else:
+            images = np.empty((len(indices),) + self.image_shape, dtype=np.uint8)
+            for shard_id in np.unique(shard_ids):
+                rows = shard_ids == shard_id
+                # One fancy-index read per shard touched
+                images[rows] = self.shards[shard_id][local[rows]]
+        return images, self.labels[indices]
+
+    def iter_batches(self, batch_size, indices=None):
+        """Yield (images, labels) for indices (default: all samples) in order
+
+        Batches are cut at shard boundaries, so sequential reads are
+        zero-copy views of the memory map.
+        """
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        shard_ids = indices // self.shard_size
+        boundaries = np.flatnonzero(np.diff(shard_ids)) + 1
+        for group in np.split(indices, boundaries):
+            for start in range(0, len(group), batch_size):
+                yield self.get_batch(group[start:start + batch_size])
+
+
+def split_indices(dataset, seed, val_size=0.15, test_size=0.15, path=None):
+    """Stratified train/val/test index arrays for an IndexedDataset
+
+    Strata are quality tier x compliance. Only index arrays are split, so
+    no image data is copied. With path, the split is saved as .npz and
+    reused on later runs as long as the seed and strata still match.
+    """
+    from sklearn.model_selection import train_test_split
+
+    strata = dataset.tiers.astype(np.int64) * 2 + (dataset.labels[:, 1] > 0.5)
+    if path and os.path.exists(path):
+        with np.load(path) as saved:
+            if int(saved['seed']) == seed and np.array_equal(saved['strata'], strata):
+                return saved['train'], saved['val'], saved['test']
+
+    def split(indices, size):
+        try:
+            return train_test_split(indices, test_size=size, random_state=seed,
+                                    stratify=strata[indices])
+        except ValueError:
+            # A stratum with a single sample cannot be split proportionally
+            print("⚠️  Too few samples per tier/compliance stratum; splitting unstratified")
+            return train_test_split(indices, test_size=size, random_state=seed)
+
+    train, temp = split(np.arange(len(dataset)), val_size + test_size)
+    val, test = split(temp, test_size / (val_size + test_size))
+    train, val, test = np.sort(train), np.sort(val), np.sort(test)
+
+    if path:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, train=train, val=val, test=test, seed=seed, strata=strata)
+    return train, val, test
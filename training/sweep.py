@@ -0,0 +1,217 @@
+"""
+Hyperparameter Sweep
+Runs AdQualityTrainer trials in parallel worker processes, each pinned to
+its own CPU cores, and prunes weak trials by successive halving on val_loss
+
+Every rung trains the surviving trials for more epochs (continuing from
+their checkpoint), then keeps the best 1/eta of them. Results are ranked
+and written to ../logs/sweep_results.json.
+
+Usage:
+  python sweep.py [--trials 12] [--workers 4] [--min-epochs 2] [--max-epochs 20] [--eta 3]
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from train_ad_quality_model import CONFIG
+
+SEARCH_SPACE = {
+    'learning_rate': [1e-4, 3e-4, 1e-3, 3e-3],
+    'batch_size': [16, 32, 64],
+}
+SWEEP_DIR = '../logs/sweep'
+RESULTS_PATH = '../logs/sweep_results.json'
+
+# Per worker process: its data, loaded once and reused by every trial it runs
+_worker_state = {}
+
+
+def sample_trials(search_space, n_trials, seed):
+    """The full grid if it has at most n_trials points, else a random sample of it"""
+    names = sorted(search_space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(search_space[n] for n in names))]
+    if len(grid) > n_trials:
+        grid = random.Random(seed).sample(grid, n_trials)
+    return [{'trial': i, 'params': params, 'epochs': 0, 'val_loss': None, 'pruned_at': None}
+            for i, params in enumerate(grid)]
+
+
+def _init_worker(core_sets, data_args):
+    """Pin this worker process to a free core set before TensorFlow starts"""
+    cores = core_sets.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    _worker_state['cores'] = cores
+    _worker_state['data_args'] = data_args
+
+    # One intra-op thread per pinned core, for every trial this process runs
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(len(cores))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _load_data(trainer):
+    """Training data and split for this worker (generated or memory-mapped once)"""
+    if 'dataset' not in _worker_state:
+        from sharded_dataset import ArrayDataset, ShardedDataset, split_indices
+        import numpy as np
+
+        shard_dir, n_samples = _worker_state['data_args']
+        if shard_dir:
+            dataset = ShardedDataset(shard_dir)
+        else:
+            X, y = trainer.generate_synthetic_data(n_samples=n_samples)
+            dataset = ArrayDataset(X, y, np.digitize(y[:, 0], [40, 70]))
+        train_idx, val_idx, _ = split_indices(dataset, trainer.config['seed'])
+        _worker_state['dataset'] = (dataset, train_idx, val_idx)
+    return _worker_state['dataset']
+
+
+def run_trial(trial, params, initial_epoch, epochs):
+    """Train one trial from initial_epoch to epochs; returns its best val_loss so far"""
+    from tensorflow import keras
+    from train_ad_quality_model import AdQualityTrainer
+
+    config = dict(CONFIG, **params, intra_op_threads=0, inter_op_threads=0)
+    trainer = AdQualityTrainer(config)
+    dataset, train_idx, val_idx = _load_data(trainer)
+
+    checkpoint = os.path.join(SWEEP_DIR, f'trial_{trial:03d}.keras')
+    if initial_epoch and os.path.exists(checkpoint):
+        model = keras.models.load_model(checkpoint)
+    else:
+        model = trainer.compile_model(trainer.build_quality_model())
+
+    start = time.perf_counter()
+    history = model.fit(
+        dataset.as_tf_dataset(config['batch_size'], train_idx, shuffle=True, seed=config['seed']),
+        validation_data=dataset.as_tf_dataset(config['batch_size'], val_idx),
+        initial_epoch=initial_epoch,
+        epochs=epochs,
+        verbose=0
+    )
+    model.save(checkpoint)
+    return {
+        'val_loss': float(min(history.history['val_loss'])),
+        'seconds': time.perf_counter() - start,
+        'cores': sorted(_worker_state['cores'])
+    }
+
+
+def successive_halving(trials, workers, min_epochs, max_epochs, eta, data_args):
+    """Run rungs of min_epochs * eta^k epochs, keeping the best 1/eta trials after each"""
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') \
+        else list(range(os.cpu_count() or 1))
+    workers = max(1, min(workers, len(trials), len(cores)))
+    per_worker = len(cores) // workers
+
+    # Spawned workers each take one disjoint core set from the queue at start-up
+    context = multiprocessing.get_context('spawn')
+    core_sets = context.Manager().Queue()
+    for w in range(workers):
+        core_sets.put(set(cores[w * per_worker:(w + 1) * per_worker]))
+
+    survivors = list(trials)
+    budget = min(min_epochs, max_epochs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(core_sets, data_args)) as pool:
+        while True:
+            print(f"\n🪜 Rung: {len(survivors)} trials -> {budget} epochs ({workers} workers x "
+                  f"{per_worker} cores)")
+            futures = {
+                pool.submit(run_trial, t['trial'], t['params'], t['epochs'], budget): t
+                for t in survivors
+            }
+            for future in as_completed(futures):
+                trial = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    trial['error'] = str(e)
+                    print(f"   trial {trial['trial']:3d} ❌ {e}")
+                    continue
+                trial.update(epochs=budget, val_loss=result['val_loss'])
+                print(f"   trial {trial['trial']:3d} {_describe(trial['params'])}  "
+                      f"val_loss {result['val_loss']:10.4f}  ({result['seconds']:.0f}s, "
+                      f"cores {result['cores']})")
+
+            survivors = sorted((t for t in survivors if 'error' not in t),
+                               key=lambda t: t['val_loss'])
+            if budget >= max_epochs or len(survivors) <= 1:
+                break
+            keep = max(1, len(survivors) // eta)
+            for trial in survivors[keep:]:
+                trial['pruned_at'] = budget
+            survivors = survivors[:keep]
+            budget = min(budget * eta, max_epochs)
+
+    return rank(trials)
+
+
+def rank(trials):
+    """Trials that trained longest first, then by val_loss"""
+    return sorted(trials, key=lambda t: (-t['epochs'], t['val_loss'] is None,
+                                         t['val_loss'] if t['val_loss'] is not None else 0))
+
+
+def _describe(params):
+    return ' '.join(f"{name}={value:<7g}" if isinstance(value, float) else f"{name}={value:<4}"
+                    for name, value in sorted(params.items()))
+
+
+def print_results(ranked):
+    print("\n🏁 Sweep Results:")
+    print(f"   {'rank':<5}{'trial':<7}{'params':<42}{'epochs':>7}{'val_loss':>12}  status")
+    for position, trial in enumerate(ranked, 1):
+        if 'error' in trial:
+            status = 'failed'
+        elif trial['pruned_at']:
+            status = f"pruned at {trial['pruned_at']}"
+        else:
+            status = 'finished'
+        val_loss = f"{trial['val_loss']:.4f}" if trial['val_loss'] is not None else '-'
+        print(f"   {position:<5}{trial['trial']:<7}{_describe(trial['params']):<42}"
+              f"{trial['epochs']:>7}{val_loss:>12}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter sweep")
+    parser.add_argument('--trials', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-epochs', type=int, default=2)
+    parser.add_argument('--max-epochs', type=int, default=CONFIG['epochs'])
+    parser.add_argument('--eta', type=int, default=3, help="keep the best 1/eta trials per rung")
+    parser.add_argument('--shard-dir', default=CONFIG['shard_dir'],
+                        help="train from prepare_data.py shards instead of synthetic data")
+    parser.add_argument('--n-samples', type=int, default=CONFIG['n_samples'])
+    args = parser.parse_args()
+
+    print("="*60)
+    print("RetailSync AI - Hyperparameter Sweep")
+    print("="*60)
+
+    start = time.perf_counter()
+    trials = sample_trials(SEARCH_SPACE, args.trials, CONFIG['seed'])
+    ranked = successive_halving(trials, args.workers, args.min_epochs, args.max_epochs,
+                                args.eta, (args.shard_dir, args.n_samples))
+    elapsed = time.perf_counter() - start
+
+    print_results(ranked)
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump({'search_space': SEARCH_SPACE, 'eta': args.eta, 'min_epochs': args.min_epochs,
+                   'max_epochs': args.max_epochs, 'seconds': round(elapsed, 1),
+                   'results': ranked}, f, indent=2)
+    print(f"\n📝 Sweep results saved to: {RESULTS_PATH} ({elapsed:.0f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Tests for download_sample_images against a local HTTP server: retry on
+5xx, content dedup, and no .part files left behind on failures.
+
+Run from training/: python -m pytest -q test_prepare_data.py
+"""
+
+import os
+import threading
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from dataset_manifest import DatasetManifest
+from prepare_data import download_sample_images
+
+
+def _png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+RED = _png((255, 0, 0))
+BLUE = _png((0, 0, 255))
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path == '/flaky.png' and Handler.hits[self.path] == 1:
+            self.send_error(503)
+            return
+        if self.path in ('/red.png', '/red_copy.png', '/flaky.png'):
+            self._send(RED if self.path != '/flaky.png' else BLUE, 'image/png')
+        elif self.path == '/page.html':
+            self._send(b'<html>Not found</html>', 'text/html')
+        elif self.path == '/truncated.png':
+            # Promise more bytes than are sent, then drop the connection
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(RED) * 4))
+            self.end_headers()
+            self.wfile.write(RED)
+            self.wfile.flush()
+            self.close_connection = True
+        else:
+            self.send_error(404)
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _download(tmp_path, urls):
+    manifest = DatasetManifest(str(tmp_path / 'manifest.json'))
+    output_dir = tmp_path / 'images'
+    saved = download_sample_images({'high_quality': urls}, output_dir=str(output_dir),
+                                   max_workers=2, backoff=0, timeout=5, manifest=manifest)
+    return saved['high_quality'], os.listdir(output_dir / 'high_quality')
+
+
+def test_retries_server_errors(tmp_path, server):
+    saved, files = _download(tmp_path, [f'{server}/flaky.png'])
+    assert Handler.hits['/flaky.png'] == 2
+    assert len(saved) == 1 and files == [os.path.basename(saved[0])]
+    assert saved[0].endswith('.png')
+
+
+def test_identical_content_is_kept_once(tmp_path, server):
+    saved, files = _download(tmp_path, [f'{server}/red.png', f'{server}/red_copy.png'])
+    assert len(saved) == 1 and len(files) == 1
+
+
+def test_failed_downloads_leave_no_partial_files(tmp_path, server):
+    saved, files = _download(tmp_path, [f'{server}/truncated.png', f'{server}/page.html',
+                                        f'{server}/missing.png'])
+    assert saved == [] and files == []
@@ -0,0 +1,142 @@
+"""
+Training Throughput Monitor
+Per-epoch samples/sec, train step latency percentiles, time blocked on the
+input pipeline versus time computing, and peak resident memory.
+
+Input wait is optional (CONFIG['time_input'] / --time-input): fit is then
+fed through timed_input, which pulls each batch from the real pipeline
+and records how long that took. The wait happens inside the train step,
+so compute time is step time minus input wait. The wrapper is a Python
+generator, which itself costs some throughput, so it is off by default
+and input wait is reported as None.
+"""
+
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def latency_stats(step_times):
+    """p50/p95/p99 and mean of step times in seconds, reported in ms"""
+    if not len(step_times):
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    p50, p95, p99 = np.percentile(step_times, [50, 95, 99]) * 1000
+    return {'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'mean_ms': round(float(np.mean(step_times)) * 1000, 2)}
+
+
+class ThroughputMonitor(keras.callbacks.Callback):
+    def __init__(self, batch_size):
+        """Collect throughput stats per epoch into self.epochs
+
+        batch_size is used to count samples when the input was not passed
+        through timed_input (arrays or distributed datasets); input wait is
+        then unknown and reported as None.
+        """
+        super().__init__()
+        self.batch_size = batch_size
+        self.epochs = []
+        self._timed = False
+        self._wait = 0.0
+        self._samples = 0
+
+    def timed_input(self, dataset):
+        """Wrap a batched (images, labels) tf.data.Dataset to time each fetch"""
+        self._timed = True
+
+        def generate():
+            iterator = iter(dataset)
+            while True:
+                start = time.perf_counter()
+                try:
+                    images, labels = next(iterator)
+                except StopIteration:
+                    return
+                self._wait += time.perf_counter() - start
+                self._samples += int(images.shape[0])
+                yield images, labels
+
+        return tf.data.Dataset.from_generator(generate, output_signature=dataset.element_spec)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._step_times = []
+        self._wait = 0.0
+        self._samples = 0
+        self._epoch_start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step_times.append(time.perf_counter() - self._step_start)
+
+    def on_epoch_end(self, epoch, logs=None):
+        train_time = float(np.sum(self._step_times))
+        rss = peak_rss_mb()
+        samples = self._samples if self._timed else len(self._step_times) * self.batch_size
+        stats = {
+            'epoch': epoch,
+            'steps': len(self._step_times),
+            'samples': samples,
+            'samples_per_sec': round(samples / train_time, 2) if train_time else None,
+            'step_latency': latency_stats(self._step_times),
+            'train_seconds': round(train_time, 3),
+            'input_wait_seconds': round(self._wait, 3) if self._timed else None,
+            'compute_seconds': round(train_time - self._wait, 3) if self._timed else None,
+            # Validation and callbacks run outside the train steps
+            'epoch_seconds': round(time.perf_counter() - self._epoch_start, 3),
+            'peak_rss_mb': round(rss, 1) if rss is not None else None,
+        }
+        self.epochs.append(stats)
+
+    def summary(self):
+        """Stats over all epochs of this run; the first epoch includes graph tracing"""
+        if not self.epochs:
+            return None
+        train_time = sum(e['train_seconds'] for e in self.epochs)
+        samples = sum(e['samples'] for e in self.epochs)
+        summary = {
+            'epochs': len(self.epochs),
+            'samples_per_sec': round(samples / train_time, 2) if train_time else None,
+            'steady_state_p50_ms': self.epochs[-1]['step_latency']['p50_ms'],
+            'steady_state_p95_ms': self.epochs[-1]['step_latency']['p95_ms'],
+            'steady_state_p99_ms': self.epochs[-1]['step_latency']['p99_ms'],
+            'input_wait_fraction': None,
+            'peak_rss_mb': self.epochs[-1]['peak_rss_mb'],
+        }
+        if self._timed and train_time:
+            wait = sum(e['input_wait_seconds'] for e in self.epochs)
+            summary['input_wait_fraction'] = round(wait / train_time, 3)
+        return summary
+
+    def print_summary(self):
+        summary = self.summary()
+        if summary is None:
+            return
+        print("\n⏱️  Training Throughput:")
+        print(f"   Samples/sec: {summary['samples_per_sec']}")
+        print(f"   Step latency (last epoch): p50 {summary['steady_state_p50_ms']} ms, "
+              f"p95 {summary['steady_state_p95_ms']} ms, p99 {summary['steady_state_p99_ms']} ms")
+        if summary['input_wait_fraction'] is not None:
+            fraction = summary['input_wait_fraction']
+            bound = 'input-bound' if fraction > 0.5 else 'compute-bound'
+            print(f"   Input wait: {fraction:.1%} of train step time ({bound})")
+        if summary['peak_rss_mb'] is not None:
+            print(f"   Peak RSS: {summary['peak_rss_mb']:.0f} MB")
@@ -6,14 +6,29 @@ Trains CNN models for:
 """
 
 import os
+import sys
 import json
+import time
+import argparse
+import tempfile
+import shutil
+import subprocess
+import contextlib
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
+
+from export_serving_model import NUMPY_MODEL_PATH, SERVING_MODEL_PATH, export_serving_model
+from quantize_model import QUANTIZED_DIR, quantize_model
+from dataset_manifest import file_sha256
+from sharded_dataset import ArrayDataset, ShardedDataset, split_indices, synthetic_compliance
+from training_state import StateCheckpoint, latest_checkpoint
+from throughput_monitor import ThroughputMonitor
+from profiling import PROFILE_DIR, CallProfile, python_profile, trace_callback
 
 # Configuration
 CONFIG = {
@@ -22,15 +37,48 @@ CONFIG = {
     'batch_size': 32,
     'epochs': 20,
     'learning_rate': 0.001,
-    'seed': 42
+    'seed': 42,
+    'calibration_samples': 200,  # int8 quantization calibration sample
+    'n_samples': 1000,
+    'streaming': False,   # generate batches lazily with tf.data instead of in RAM
+    'chunk_size': 256,    # samples per generator chunk (and per streamed map element)
+    'shard_dir': None,    # e.g. '../data/shards' from prepare_data.py; overrides synthetic data
+    'split_path': '../logs/split_indices.npz',  # persisted train/val/test indices
+    'augment_in_pipeline': False,  # augment in tf.data instead of inside the model
+    # CPU performance mode (see --benchmark-performance to pick values per host)
+    'jit_compile': False,     # XLA-compile the train step (implies augment_in_pipeline)
+    'intra_op_threads': 0,    # threads within one op; 0 = TensorFlow default
+    'inter_op_threads': 0,    # ops run concurrently; 0 = TensorFlow default
+    'distributed': False,     # MultiWorkerMirroredStrategy; cluster from TF_CONFIG (launch_distributed.py)
+    'state_dir': '../models/checkpoints',  # full training state for --resume
+    'checkpoint_every': 1,    # epochs between training state checkpoints
+    'keep_checkpoints': 3,    # most recent training state checkpoints kept
+    'time_input': False,      # time input fetches to split step time into input wait / compute
+                              # (re-wraps the training input in a Python generator; --time-input)
+    'profile': False,         # profiler trace of some train steps + cProfile of data generation
+    'profile_start_step': 5,  # first traced train step (skips tracing/warm-up)
+    'profile_steps': 10       # train steps in the profiler trace
 }
 
 class AdQualityTrainer:
     def __init__(self, config):
+        if config['jit_compile'] and not config['augment_in_pipeline']:
+            # The random augmentation layers cannot be XLA-compiled, and Keras
+            # would silently fall back to an uncompiled train step
+            print("ℹ️  jit_compile: augmentation moves to the input pipeline")
+            config['augment_in_pipeline'] = True
         self.config = config
         self.model = None
         self.history = None
+        self.throughput = None
+        self.current_epoch = 0
+        self.pipeline_augmentation = None
+        self.generation_profile = None   # CallProfile of streamed chunk generation
         self.setup_directories()
+        self.configure_threading()
+        self.task_id = 0
+        self.num_workers = 1
+        self.strategy = self.create_strategy()
         
     def setup_directories(self):
         """Create necessary directories"""
@@ -38,16 +86,27 @@ class AdQualityTrainer:
         os.makedirs('../logs', exist_ok=True)
         os.makedirs('../data/training_images', exist_ok=True)
         
-    def build_quality_model(self):
-        """Build CNN for Ad Quality Scoring (regression)"""
+    def augmentation_layers(self):
+        """Random flip/rotation/zoom applied to training images"""
+        return [
+            layers.RandomFlip("horizontal"),
+            layers.RandomRotation(0.1),
+            layers.RandomZoom(0.1),
+        ]
+    
+    def build_quality_model(self, include_augmentation=True):
+        """Build CNN for Ad Quality Scoring (regression)
+        
+        include_augmentation=False leaves the augmentation layers out, for
+        when augment_dataset applies them in the input pipeline instead.
+        """
+        augmentation = self.augmentation_layers() if include_augmentation else []
         model = keras.Sequential([
             # Input layer
             layers.Input(shape=(self.config['img_height'], self.config['img_width'], 3)),
             
             # Data augmentation
-            layers.RandomFlip("horizontal"),
-            layers.RandomRotation(0.1),
-            layers.RandomZoom(0.1),
+            *augmentation,
             
             # Rescaling
             layers.Rescaling(1./255),
@@ -81,76 +140,272 @@ class AdQualityTrainer:
         
         return model
     
+    def configure_threading(self):
+        """Apply the intra-/inter-op thread pool sizes from the config
+        
+        TensorFlow fixes its thread pools when the runtime starts, so this
+        only takes effect before the first op runs in the process.
+        """
+        intra, inter = self.config['intra_op_threads'], self.config['inter_op_threads']
+        if not intra and not inter:
+            return
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+            print(f"🧵 Thread pools: intra-op {intra or 'default'}, inter-op {inter or 'default'}")
+        except RuntimeError as e:
+            print(f"⚠️  Could not set thread pools, TensorFlow is already initialized: {e}")
+    
+    def create_strategy(self):
+        """MultiWorkerMirroredStrategy when distributed, else the default strategy
+        
+        Every worker holds a full replica; gradients and metrics are
+        all-reduced across workers each step. The cluster and this worker's
+        index come from the TF_CONFIG environment variable.
+        """
+        if not self.config['distributed']:
+            return tf.distribute.get_strategy()
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+        resolver = strategy.cluster_resolver
+        self.task_id = resolver.task_id if resolver.task_type else 0
+        self.num_workers = len(resolver.cluster_spec().as_dict().get('worker', [])) or 1
+        print(f"🌐 Worker {self.task_id} of {self.num_workers} "
+              f"({'chief' if self.is_chief else 'worker'})")
+        return strategy
+    
+    @property
+    def is_chief(self):
+        """Worker 0 writes checkpoints, artifacts and logs"""
+        return self.task_id == 0
+    
+    def input_fn(self, make_dataset, training=False):
+        """Input for train/evaluate, sharded per worker when distributed
+        
+        make_dataset(num_shards, shard_index, batch_size) must return a
+        batched tf.data.Dataset over only that shard. Single process: the
+        plain dataset with the configured batch size. Distributed: each
+        worker builds its own shard with the per-replica batch size, and
+        training input is augmented here when augment_in_pipeline is set
+        (train can only augment plain datasets).
+        """
+        if not self.config['distributed']:
+            return make_dataset(1, 0, self.config['batch_size'])
+        
+        def dataset_fn(context):
+            batch_size = context.get_per_replica_batch_size(self.config['batch_size'])
+            dataset = make_dataset(context.num_input_pipelines, context.input_pipeline_id, batch_size)
+            if training and self.config['augment_in_pipeline']:
+                dataset = self.augment_dataset(dataset)
+            return dataset
+        
+        return self.strategy.distribute_datasets_from_function(dataset_fn)
+    
     def compile_model(self, model):
         """Compile model with custom loss"""
         model.compile(
             optimizer=keras.optimizers.Adam(learning_rate=self.config['learning_rate']),
             loss='mse',
-            metrics=['mae', 'mse']
+            metrics=['mae', 'mse'],
+            # The distributed training loop (fit_distributed) is not XLA-compiled
+            jit_compile=self.config['jit_compile'] and not self.config['distributed']
         )
         return model
     
-    def generate_synthetic_data(self, n_samples=1000):
-        """Generate synthetic training data"""
+    def generate_synthetic_data(self, n_samples=1000, chunk_size=256, seed=None, workers=None):
+        """Generate synthetic training data
+        
+        Samples are written chunk by chunk into one preallocated uint8 array.
+        Chunk k draws from np.random.default_rng([seed, k]), so the output
+        depends only on (seed, chunk_size) - not on how many worker threads
+        fill the chunks - and any chunk can be regenerated on its own.
+        """
         print(f"Generating {n_samples} synthetic training samples...")
+        seed = self.config['seed'] if seed is None else seed
+        start_time = time.perf_counter()
         
-        X = []
-        y_quality = []
-        y_compliance = []
+        X = np.empty((n_samples, self.config['img_height'], self.config['img_width'], 3),
+                     dtype=np.uint8)
+        y = np.empty((n_samples, 2), dtype=np.float32)
         
-        for i in range(n_samples):
-            # Generate random image
-            img = np.random.randint(0, 255, 
-                (self.config['img_height'], self.config['img_width'], 3), 
-                dtype=np.uint8)
-            
-            # Add some patterns to simulate ad features
-            # High quality ads: more structured patterns
-            quality_level = np.random.rand()
-            
-            if quality_level > 0.7:  # High quality
-                # Add structured rectangles (simulating text/images)
-                for _ in range(3):
-                    x, y = np.random.randint(0, 150, 2)
-                    w, h = np.random.randint(20, 50, 2)
-                    color = np.random.randint(100, 255, 3)
-                    img[y:y+h, x:x+w] = color
-                quality_score = np.random.uniform(70, 100)
-                compliance = 1 if quality_score > 75 else 0
-                
-            elif quality_level > 0.4:  # Medium quality
-                # Add some patterns
-                for _ in range(2):
-                    x, y = np.random.randint(0, 180, 2)
-                    w, h = np.random.randint(10, 30, 2)
-                    color = np.random.randint(50, 200, 3)
-                    img[y:y+h, x:x+w] = color
-                quality_score = np.random.uniform(40, 70)
-                compliance = 1 if quality_score > 60 else 0
-                
-            else:  # Low quality
-                # Mostly noise
-                quality_score = np.random.uniform(0, 40)
-                compliance = 0
-            
-            X.append(img)
-            y_quality.append(quality_score)
-            y_compliance.append(compliance)
+        def fill(chunk_index):
+            start = chunk_index * chunk_size
+            stop = min(start + chunk_size, n_samples)
+            rng = np.random.default_rng([seed, chunk_index])
+            self._generate_chunk(rng, X[start:stop], y[start:stop])
         
-        X = np.array(X, dtype=np.uint8)
-        y = np.column_stack([y_quality, y_compliance])
+        # NumPy releases the GIL for the bulk draws, so chunks fill in parallel
+        n_chunks = -(-n_samples // chunk_size)
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(fill, range(n_chunks)))
         
+        elapsed = time.perf_counter() - start_time
+        print(f"   {n_samples / max(elapsed, 1e-9):,.0f} samples/sec ({elapsed:.2f}s)")
         return X, y
     
-    def train(self, X_train, y_train, X_val, y_val):
-        """Train the model"""
+    def _generate_chunk(self, rng, X, y):
+        """Fill X (n, H, W, 3) and y (n, 2) in place with one vectorized draw"""
+        n, height, width, _ = X.shape
+        
+        # Random noise background in [0, 255): the bit generator's raw 64-bit
+        # words, split into bytes, are the cheapest uniform draw (Generator.bytes
+        # and .integers are both slower than legacy randint); the rare 255s are
+        # redrawn so the range stays exact
+        noise = rng.bit_generator.random_raw(-(-X.size // 8)).view(np.uint8)[:X.size]
+        redraw = np.flatnonzero(noise == 255)
+        noise[redraw] = rng.integers(0, 255, len(redraw), dtype=np.uint8)
+        X[...] = noise.reshape(X.shape)
+        
+        # Quality tier: high (> 0.7), medium (> 0.4), low (noise only)
+        quality_level = rng.random(n)
+        high = quality_level > 0.7
+        medium = (quality_level > 0.4) & ~high
+        
+        # High quality ads get 3 structured rectangles, medium ones get 2
+        n_rects = np.where(high, 3, np.where(medium, 2, 0))
+        max_pos = np.where(high, 150, 180)
+        size_low, size_high = np.where(high, 20, 10), np.where(high, 50, 30)
+        color_low, color_high = np.where(high, 100, 50), np.where(high, 255, 200)
+        
+        # Paint each rectangle through a (n, 50, 50) index grid rather than a
+        # full-image mask; offsets past the rectangle or the image are dropped
+        offsets = np.arange(50)
+        sample_idx = np.broadcast_to(np.arange(n)[:, None, None], (n, 50, 50))
+        for k in range(3):
+            left = rng.integers(0, max_pos)
+            top = rng.integers(0, max_pos)
+            w = rng.integers(size_low, size_high)
+            h = rng.integers(size_low, size_high)
+            color = rng.integers(color_low[:, None], color_high[:, None], (n, 3)).astype(np.uint8)
+            
+            rr, cc = np.broadcast_arrays(top[:, None, None] + offsets[None, :, None],
+                                         left[:, None, None] + offsets[None, None, :])
+            valid = ((offsets[None, :, None] < h[:, None, None])
+                     & (offsets[None, None, :] < w[:, None, None])
+                     & (rr < height) & (cc < width)
+                     & (n_rects > k)[:, None, None])
+            X[sample_idx[valid], rr[valid], cc[valid]] = color[sample_idx[valid]]
+        
+        # Labels: score range per tier, compliance thresholded within tier
+        score_low = np.where(high, 70, np.where(medium, 40, 0))
+        quality_score = score_low + rng.random(n) * np.where(high, 30, np.where(medium, 30, 40))
+        y[:, 0] = quality_score
+        y[:, 1] = synthetic_compliance(np.where(high, 2, np.where(medium, 1, 0)), quality_score)
+    
+    def make_synthetic_dataset(self, start, stop, shuffle=False, num_shards=1, shard_index=0,
+                               batch_size=None):
+        """Stream synthetic samples [start, stop) as a tf.data pipeline
+        
+        Row r is the same sample generate_synthetic_data(CONFIG['n_samples'],
+        CONFIG['chunk_size']) puts at X[r]: the chunks overlapping the range
+        are generated in parallel map stages, trimmed to the range,
+        unbatched, re-batched and prefetched, so peak memory is a few chunks
+        regardless of dataset size. With num_shards > 1 the range is cut
+        into num_shards equal contiguous parts (dropping at most
+        num_shards - 1 rows) so every shard has the same number of batches.
+        """
+        chunk_size = self.config['chunk_size']
+        n_samples = self.config['n_samples']
+        height, width = self.config['img_height'], self.config['img_width']
+        seed = self.config['seed']
+        if not 0 <= start < stop <= n_samples:
+            raise ValueError(f"Sample range [{start}, {stop}) is empty or outside "
+                             f"the {n_samples} synthetic samples")
+        if num_shards > 1:
+            per_shard = (stop - start) // num_shards
+            if per_shard == 0:
+                raise ValueError(f"{stop - start} samples cannot be split across "
+                                 f"{num_shards} workers")
+            start += shard_index * per_shard
+            stop = start + per_shard
+        
+        def generate(chunk_index):
+            chunk_index = int(chunk_index)
+            offset = chunk_index * chunk_size
+            # The chunk is drawn at its full size, as in generate_synthetic_data
+            count = min(chunk_size, n_samples - offset)
+            X = np.empty((count, height, width, 3), dtype=np.uint8)
+            y = np.empty((count, 2), dtype=np.float32)
+            self._generate_chunk(np.random.default_rng([seed, chunk_index]), X, y)
+            lo, hi = max(start - offset, 0), min(stop - offset, count)
+            return X[lo:hi], y[lo:hi]
+        
+        if self.generation_profile is not None:
+            # tf.data runs generate on its own threads, out of python_profile's reach
+            generate = self.generation_profile.wrap(generate)
+        
+        def generate_chunk(chunk_index):
+            X, y = tf.numpy_function(generate, [chunk_index], (tf.uint8, tf.float32))
+            X.set_shape((None, height, width, 3))
+            y.set_shape((None, 2))
+            return X, y
+        
+        dataset = tf.data.Dataset.range(start // chunk_size, (stop - 1) // chunk_size + 1)
+        dataset = dataset.map(generate_chunk, num_parallel_calls=tf.data.AUTOTUNE)
+        dataset = dataset.unbatch()
+        if shuffle:
+            dataset = dataset.shuffle(2 * chunk_size, seed=seed)
+        dataset = dataset.batch(batch_size or self.config['batch_size'])
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    
+    def augment_dataset(self, dataset):
+        """Apply augmentation as a parallel, prefetched map over a batched dataset
+        
+        The random layers run on tf.data worker threads, overlapping with the
+        training step instead of running inside it. The layers are created
+        once per trainer so their seed state is checkpointed with the model.
+        """
+        if self.pipeline_augmentation is None:
+            self.pipeline_augmentation = keras.Sequential(self.augmentation_layers(),
+                                                          name='augmentation')
+        augmentation = self.pipeline_augmentation
+        
+        def augment(images, labels):
+            return augmentation(tf.cast(images, tf.float32), training=True), labels
+        
+        dataset = dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+    
+    def train(self, X_train, y_train=None, X_val=None, y_val=None, resume=False):
+        """Train the model
+        
+        X_train/y_train and X_val/y_val are NumPy arrays, or X_train and X_val
+        are batched tf.data.Datasets of (images, labels) that are consumed
+        directly, or distributed datasets from input_fn. With
+        CONFIG['augment_in_pipeline'] (implied by CONFIG['jit_compile']) the
+        model is built without augmentation layers and augment_dataset runs
+        them on the training input instead.
+        
+        The full training state is checkpointed to CONFIG['state_dir'] every
+        CONFIG['checkpoint_every'] epochs; resume=True continues from the
+        latest checkpoint there.
+        """
         print("\n" + "="*50)
         print("Starting Training...")
         print("="*50)
         
-        # Build and compile model
-        self.model = self.build_quality_model()
-        self.model = self.compile_model(self.model)
+        in_pipeline = self.config['augment_in_pipeline']
+        if in_pipeline and not isinstance(X_train, tf.distribute.DistributedDataset):
+            if not isinstance(X_train, tf.data.Dataset):
+                source = ArrayDataset(X_train, y_train, np.zeros(len(X_train)))
+                X_train = source.as_tf_dataset(self.config['batch_size'], shuffle=True,
+                                               seed=self.config['seed'],
+                                               epoch_fn=lambda: self.current_epoch)
+                X_val = ArrayDataset(X_val, y_val, np.zeros(len(X_val))).as_tf_dataset(
+                    self.config['batch_size'])
+            X_train = self.augment_dataset(X_train)
+        
+        self.throughput = ThroughputMonitor(self.config['batch_size'])
+        if self.config['time_input'] and isinstance(X_train, tf.data.Dataset):
+            X_train = self.throughput.timed_input(X_train)
+        
+        # Build and compile model (variables are mirrored on every worker)
+        with self.strategy.scope():
+            self.model = self.build_quality_model(include_augmentation=not in_pipeline)
+            self.model = self.compile_model(self.model)
+        
+        if self.config['jit_compile'] and not self.model.jit_compile:
+            print("⚠️  jit_compile is off for this model (distributed training, or layers "
+                  "XLA cannot compile); training without XLA")
         
         # Print model summary
         self.model.summary()
@@ -169,61 +424,205 @@ class AdQualityTrainer:
                 min_lr=1e-7
             ),
             keras.callbacks.ModelCheckpoint(
-                '../models/best_model.keras',
+                # Only the chief's checkpoint is kept; other workers write to scratch
+                '../models/best_model.keras' if self.is_chief else
+                os.path.join(tempfile.gettempdir(), f'best_model_worker{self.task_id}.keras'),
                 monitor='val_loss',
                 save_best_only=True
-            )
+            ),
+            self.throughput
         ]
+        if self.config['profile'] and self.is_chief:
+            callbacks.append(trace_callback(os.path.join(PROFILE_DIR, 'train'),
+                                            self.config['profile_start_step'],
+                                            self.config['profile_steps']))
+        
+        # Full training state, written in the background; last so that on
+        # resume it restores the other callbacks after they reset themselves
+        restore_from = latest_checkpoint(self.config['state_dir']) if resume else None
+        if resume and restore_from is None:
+            print(f"⚠️  No training state in {self.config['state_dir']}; starting from scratch")
+        state = StateCheckpoint(
+            self.config['state_dir'],
+            every=self.config['checkpoint_every'],
+            keep=self.config['keep_checkpoints'],
+            tracked_callbacks=callbacks,
+            extra_models=[self.pipeline_augmentation] if self.pipeline_augmentation else [],
+            restore_from=restore_from,
+            write=self.is_chief
+        )
+        callbacks = callbacks + [
+            keras.callbacks.LambdaCallback(
+                on_epoch_begin=lambda epoch, logs: setattr(self, 'current_epoch', epoch)),
+            state
+        ]
+        self.current_epoch = state.initial_epoch
         
         # Train
+        if self.config['distributed']:
+            self.history = self.fit_distributed(X_train, X_val, state.initial_epoch, callbacks)
+            self.history.history = state.history
+            return self.history
+        if y_train is None:
+            data = dict(x=X_train, validation_data=X_val)
+        else:
+            data = dict(x=X_train, y=y_train, validation_data=(X_val, y_val),
+                        batch_size=self.config['batch_size'])
         self.history = self.model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
+            **data,
             epochs=self.config['epochs'],
-            batch_size=self.config['batch_size'],
+            initial_epoch=state.initial_epoch,
             callbacks=callbacks,
             verbose=1
         )
+        # History of the whole run, including epochs before a resume
+        self.history.history = state.history
         
         return self.history
     
-    def evaluate(self, X_test, y_test):
-        """Evaluate model on test set"""
+    def distributed_step_fns(self):
+        """(train_step, eval_step) running one batch on every replica
+        
+        Each takes a batch of a distributed dataset and returns the sums of
+        squared error, absolute error (both averaged over the 2 outputs)
+        and the sample count, all-reduced over the workers. The train step
+        minimizes the mse over the global batch, as compile_model's loss
+        does on one process.
+        """
+        if getattr(self, '_step_fns', None) is None:
+            model, strategy = self.model, self.strategy
+            
+            def batch_sums(labels, predictions):
+                error = labels - predictions
+                return tf.stack([
+                    tf.reduce_sum(tf.reduce_mean(tf.square(error), axis=-1)),
+                    tf.reduce_sum(tf.reduce_mean(tf.abs(error), axis=-1)),
+                    tf.cast(tf.shape(labels)[0], tf.float32)
+                ])
+            
+            def train_replica(images, labels):
+                with tf.GradientTape() as tape:
+                    predictions = model(tf.cast(images, tf.float32), training=True)
+                    squared = tf.reduce_mean(tf.square(labels - predictions), axis=-1)
+                    loss = tf.nn.compute_average_loss(squared)
+                gradients = tape.gradient(loss, model.trainable_variables)
+                model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+                return batch_sums(labels, predictions)
+            
+            def eval_replica(images, labels):
+                return batch_sums(labels, model(tf.cast(images, tf.float32), training=False))
+            
+            def all_replicas(replica_fn):
+                @tf.function
+                def step(batch):
+                    sums = strategy.run(replica_fn, args=batch)
+                    return strategy.reduce(tf.distribute.ReduceOp.SUM, sums, axis=None)
+                return step
+            
+            self._step_fns = all_replicas(train_replica), all_replicas(eval_replica)
+        return self._step_fns
+    
+    def run_distributed(self, step, dataset, callbacks=None):
+        """Run step over every batch of a distributed dataset; returns loss/mae/mse logs"""
+        totals = np.zeros(3)
+        for batch_index, batch in enumerate(dataset):
+            if callbacks is not None:
+                callbacks.on_train_batch_begin(batch_index)
+            sums = step(batch).numpy()
+            totals += sums
+            if callbacks is not None:
+                callbacks.on_train_batch_end(batch_index, {'loss': float(sums[0] / sums[2])})
+        squared, absolute, count = totals
+        return {'loss': squared / count, 'mae': absolute / count, 'mse': squared / count}
+    
+    def fit_distributed(self, X_train, X_val, initial_epoch, callbacks):
+        """Custom training loop over distributed datasets, driving the Keras callbacks
+        
+        model.fit cannot consume distributed datasets under
+        MultiWorkerMirroredStrategy in Keras 3, so multi-worker training runs
+        strategy.run per batch instead. Losses and metrics are all-reduced,
+        so EarlyStopping / ReduceLROnPlateau decide identically on every
+        worker. Returns a History like fit.
+        """
+        history = keras.callbacks.History()
+        callbacks = keras.callbacks.CallbackList(
+            callbacks + [history], add_progbar=True, model=self.model,
+            verbose=1, epochs=self.config['epochs'], steps=None
+        )
+        train_step, eval_step = self.distributed_step_fns()
+        # Optimizer slots must be mirrored too; StateCheckpoint restores into them
+        with self.strategy.scope():
+            self.model.optimizer.build(self.model.trainable_variables)
+        
+        self.model.stop_training = False
+        logs = {}
+        callbacks.on_train_begin()
+        for epoch in range(initial_epoch, self.config['epochs']):
+            callbacks.on_epoch_begin(epoch)
+            logs = self.run_distributed(train_step, X_train, callbacks)
+            val_logs = self.run_distributed(eval_step, X_val)
+            logs.update({f'val_{name}': value for name, value in val_logs.items()})
+            callbacks.on_epoch_end(epoch, logs)
+            if self.model.stop_training:
+                break
+        callbacks.on_train_end(logs)
+        return history
+    
+    def evaluate(self, X_test, y_test=None, samples=None):
+        """Evaluate model on test set (arrays, or a batched/distributed dataset)
+        
+        samples optionally gives the (images, labels) to print sample
+        predictions for; by default they come from the test data.
+        """
         print("\n" + "="*50)
         print("Evaluating Model...")
         print("="*50)
         
-        results = self.model.evaluate(X_test, y_test, verbose=1)
+        if isinstance(X_test, tf.distribute.DistributedDataset):
+            logs = self.run_distributed(self.distributed_step_fns()[1], X_test)
+            results = [logs['loss'], logs['mae'], logs['mse']]
+            X_test, y_test = samples if samples is not None else ([], [])
+        elif y_test is None:
+            results = self.model.evaluate(X_test, verbose=1)
+            if samples is None and isinstance(X_test, tf.data.Dataset):
+                samples = take_samples(X_test, 10)
+            X_test, y_test = samples if samples is not None else ([], [])
+        else:
+            results = self.model.evaluate(X_test, y_test, verbose=1)
         
         print(f"\nTest Loss: {results[0]:.4f}")
         print(f"Test MAE: {results[1]:.4f}")
         print(f"Test MSE: {results[2]:.4f}")
         
         # Sample predictions
+        if not len(X_test):
+            return results
         predictions = self.model.predict(X_test[:10])
         print("\nSample Predictions (Quality Score, Compliance):")
-        for i in range(10):
+        for i in range(len(predictions)):
             print(f"True: [{y_test[i][0]:.1f}, {y_test[i][1]:.0f}] | "
                   f"Pred: [{predictions[i][0]:.1f}, {predictions[i][1]:.2f}]")
         
         return results
     
-    def save_model(self):
-        """Save trained model and metadata"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Save model in multiple formats
-        self.model.save(f'../models/ad_quality_model_{timestamp}.keras')
-        self.model.save(f'../models/ad_quality_model_latest.keras')
+    def save_model(self, X_calibration=None, X_eval=None):
+        """Save the trained model, its derived formats, metadata and an artifact manifest
         
-        # Save as TensorFlow.js format for web integration
-        import tensorflowjs as tfjs
-        tfjs.converters.save_keras_model(
-            self.model, 
-            '../models/tfjs_model'
-        )
+        The version's metadata is written first, then the model is
+        serialized once to a temporary file renamed to the timestamped name,
+        so a registry watching the directory never sees a partial model or
+        one without metadata; the 'latest' name is a hard link to it, swapped
+        in atomically. The TF.js, serving and (with X_calibration) quantized
+        exports then run concurrently on worker threads, each on its own copy
+        loaded from that file; the quantized export starts from the serving
+        model once it is saved. A failed export is reported and recorded in
+        the manifest rather than aborting the others.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        model_path = f'../models/ad_quality_model_{timestamp}.keras'
+        latest_path = '../models/ad_quality_model_latest.keras'
         
-        # Save metadata
+        # Per-version copy so the registry can still find it after the next run
         metadata = {
             'timestamp': timestamp,
             'config': self.config,
@@ -239,14 +638,79 @@ class AdQualityTrainer:
                 'best_val_loss': float(min(self.history.history['val_loss']))
             }
         }
+        metadata_paths = ['../models/model_metadata.json',
+                          f'../models/model_metadata_{timestamp}.json']
+        for metadata_path in metadata_paths:
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f, indent=2)
+        
+        # Keras wants the .keras suffix; the temporary name is not a registry version
+        tmp_path = f'../models/ad_quality_model_{timestamp}.tmp.keras'
+        self.model.save(tmp_path)
+        os.replace(tmp_path, model_path)
+        link_latest(model_path, latest_path)
+        
+        def load_copy(path=model_path):
+            # Each export works on its own copy, never on the live training model
+            return keras.models.load_model(path, compile=False)
+        
+        def quantize():
+            # Reuses the serving model built (and verified) by the serving export
+            futures['serving'].result()
+            return self.export_quantized(load_copy(), load_copy(SERVING_MODEL_PATH),
+                                         X_calibration, X_eval)
         
-        with open('../models/model_metadata.json', 'w') as f:
-            json.dump(metadata, f, indent=2)
+        exports = {'tfjs': lambda: self.export_tfjs(load_copy()),
+                   'serving': lambda: self.export_serving(load_copy())}
+        if X_calibration is not None:
+            exports['quantized'] = quantize
         
+        artifacts = [model_path] + metadata_paths
+        failed = {}
+        with ThreadPoolExecutor(max_workers=len(exports)) as pool:
+            futures = {}  # filled in order: 'serving' is submitted before 'quantized'
+            for name, export in exports.items():
+                futures[name] = pool.submit(export)
+            
+            for name, future in futures.items():
+                try:
+                    artifacts.extend(future.result())
+                except Exception as e:
+                    failed[name] = f'{type(e).__name__}: {e}'
+                    print(f"⚠️  {name} export failed: {failed[name]}")
+            
+            manifest = write_artifact_manifest(
+                '../models/artifact_manifest.json', timestamp, artifacts,
+                links={latest_path: model_path}, failed=failed, pool=pool
+            )
+        
+        total_mb = sum(entry['size'] for entry in manifest['artifacts'].values()) / 1e6
         print(f"\n✅ Model saved successfully!")
-        print(f"   - Keras model: models/ad_quality_model_latest.keras")
-        print(f"   - TensorFlow.js: models/tfjs_model/")
+        print(f"   - Keras model: models/ad_quality_model_{timestamp}.keras "
+              f"(latest -> this file)")
+        if 'tfjs' not in failed:
+            print(f"   - TensorFlow.js: models/tfjs_model/")
         print(f"   - Metadata: models/model_metadata.json")
+        print(f"   - Manifest: models/artifact_manifest.json "
+              f"({len(manifest['artifacts'])} files, {total_mb:.1f} MB)")
+    
+    def export_tfjs(self, model, output_dir='../models/tfjs_model'):
+        """Save as TensorFlow.js format for web integration; returns the files written"""
+        import tensorflowjs as tfjs
+        tfjs.converters.save_keras_model(model, output_dir)
+        return [os.path.join(root, name)
+                for root, _, names in os.walk(output_dir) for name in sorted(names)]
+    
+    def export_serving(self, model):
+        """Inference-optimized Keras and NumPy models; returns the files written"""
+        export_serving_model(model)
+        return [SERVING_MODEL_PATH, NUMPY_MODEL_PATH]
+    
+    def export_quantized(self, model, serving_model, X_calibration, X_eval=None):
+        """TFLite float32/float16/int8 variants of serving_model; returns the files written"""
+        report = quantize_model(model, X_calibration, X_eval, serving_model=serving_model)
+        return [os.path.join(QUANTIZED_DIR, f'ad_quality_model_{variant}.tflite')
+                for variant in report['variants']]
     
     def plot_training_history(self):
         """Plot training curves"""
@@ -285,7 +749,11 @@ class AdQualityTrainer:
                 'mae': [float(x) for x in self.history.history['mae']],
                 'val_mae': [float(x) for x in self.history.history['val_mae']],
             },
-            'epochs_trained': len(self.history.history['loss'])
+            'epochs_trained': len(self.history.history['loss']),
+            # Whether the train step actually ran under XLA
+            'jit_compile': bool(self.model.jit_compile),
+            # Epochs trained by this process (after --resume, only the resumed ones)
+            'throughput': self.throughput.epochs if self.throughput else []
         }
         
         with open('../logs/training_log.json', 'w') as f:
@@ -293,7 +761,242 @@ class AdQualityTrainer:
         
         print(f"📝 Training log saved to: logs/training_log.json")
 
+def link_latest(target, link_path):
+    """Point link_path at target with a hard link, replaced atomically
+
+    Falls back to a copy where hard links are not supported.
+    """
+    tmp_path = link_path + '.tmp'
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(target, tmp_path)
+    except OSError:
+        shutil.copyfile(target, tmp_path)
+    os.replace(tmp_path, link_path)
+
+def write_artifact_manifest(path, timestamp, artifacts, links=None, failed=None, pool=None):
+    """Write sha256 and size of every artifact (hashed on pool if given) to path
+
+    links maps alias paths to the artifact they point at; they are listed
+    but not hashed twice.
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    key = lambda p: os.path.relpath(os.path.abspath(p), root).replace(os.sep, '/')
+    digests = (pool.map if pool else map)(file_sha256, artifacts)
+    manifest = {
+        'timestamp': timestamp,
+        'artifacts': {
+            key(artifact): {'sha256': digest, 'size': os.path.getsize(artifact)}
+            for artifact, digest in zip(artifacts, digests)
+        },
+        'links': {key(alias): key(target) for alias, target in (links or {}).items()},
+        'failed_exports': failed or {}
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+def shard_indices(indices, num_shards, shard_index):
+    """Every num_shards-th index from shard_index, trimmed so all shards are the same size"""
+    if num_shards == 1:
+        return indices
+    return indices[shard_index::num_shards][:len(indices) // num_shards]
+
+def take_samples(dataset, n):
+    """First n (images, labels) of a batched dataset as NumPy arrays"""
+    images, labels = [], []
+    count = 0
+    for batch_images, batch_labels in dataset:
+        images.append(batch_images.numpy())
+        labels.append(batch_labels.numpy())
+        count += len(images[-1])
+        if count >= n:
+            break
+    return np.concatenate(images)[:n], np.concatenate(labels)[:n]
+
+def benchmark_augmentation(trainer, dataset, indices, steps=20,
+                           output_path='../logs/augmentation_benchmark.json'):
+    """Training throughput with augmentation inside the model vs. in the input pipeline"""
+    print("\n⏱️  Benchmarking augmentation placement...")
+    batch_size = trainer.config['batch_size']
+    report = {'batch_size': batch_size, 'steps': steps}
+    
+    for mode in ('in_model', 'in_pipeline'):
+        data = dataset.as_tf_dataset(batch_size, indices, shuffle=True, seed=trainer.config['seed'])
+        if mode == 'in_pipeline':
+            data = trainer.augment_dataset(data)
+        data = data.repeat()
+        model = trainer.compile_model(
+            trainer.build_quality_model(include_augmentation=(mode == 'in_model'))
+        )
+        
+        # First steps include tracing; time only the steady state
+        model.fit(data, steps_per_epoch=2, epochs=1, verbose=0)
+        start = time.perf_counter()
+        model.fit(data, steps_per_epoch=steps, epochs=1, verbose=0)
+        elapsed = time.perf_counter() - start
+        report[mode] = {
+            'step_ms': round(elapsed / steps * 1000, 2),
+            'images_per_sec': round(steps * batch_size / elapsed, 1),
+            'jit_compile': bool(model.jit_compile)
+        }
+        print(f"   {mode:<12} {report[mode]['step_ms']:8.1f} ms/step "
+              f"{report[mode]['images_per_sec']:8.1f} images/sec")
+    
+    report['speedup'] = round(report['in_pipeline']['images_per_sec']
+                              / report['in_model']['images_per_sec'], 3)
+    print(f"   Speedup: {report['speedup']:.2f}x")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def measure_train_steps(trainer, steps=20):
+    """Steady-state ms/step and samples/sec of the train step on synthetic data"""
+    batch_size = trainer.config['batch_size']
+    X, y = trainer.generate_synthetic_data(n_samples=batch_size * 4)
+    data = ArrayDataset(X, y, np.zeros(len(X))).as_tf_dataset(batch_size)
+    in_pipeline = trainer.config['augment_in_pipeline']
+    if in_pipeline:
+        data = trainer.augment_dataset(data)
+    data = data.repeat()
+    model = trainer.compile_model(trainer.build_quality_model(include_augmentation=not in_pipeline))
+    
+    # First steps include tracing / XLA compilation; time only the steady state
+    model.fit(data, steps_per_epoch=2, epochs=1, verbose=0)
+    start = time.perf_counter()
+    model.fit(data, steps_per_epoch=steps, epochs=1, verbose=0)
+    elapsed = time.perf_counter() - start
+    return {
+        'step_ms': round(elapsed / steps * 1000, 2),
+        'samples_per_sec': round(steps * batch_size / elapsed, 1),
+        # Keras turns XLA off for models it cannot compile; report what ran
+        'jit_compile': bool(model.jit_compile),
+        'augment_in_pipeline': in_pipeline
+    }
+
+def benchmark_performance(steps=20, output_path='../logs/performance_benchmark.json'):
+    """Measure the train step under each XLA / thread pool setting
+    
+    Thread pools cannot change once TensorFlow has started, so every
+    setting runs in a fresh subprocess of this script.
+    """
+    cores = os.cpu_count() or 1
+    thread_settings = [(0, 0), (cores, 1), (max(1, cores // 2), 2)]
+    settings = [
+        {'jit_compile': jit, 'intra_op_threads': intra, 'inter_op_threads': inter}
+        for jit in (False, True)
+        for intra, inter in dict.fromkeys(thread_settings)
+    ]
+    
+    print(f"\n⏱️  Benchmarking {len(settings)} performance settings on {cores} cores...")
+    results = []
+    for setting in settings:
+        command = [sys.executable, os.path.abspath(__file__), '--benchmark-worker',
+                   '--intra-op-threads', str(setting['intra_op_threads']),
+                   '--inter-op-threads', str(setting['inter_op_threads']),
+                   '--benchmark-steps', str(steps)]
+        if setting['jit_compile']:
+            command.append('--jit-compile')
+        output = subprocess.run(command, capture_output=True, text=True).stdout
+        marker = [line for line in output.splitlines() if line.startswith('BENCHMARK_RESULT ')]
+        # The worker reports the effective jit_compile; keep the requested one too
+        result = dict(setting, jit_compile_requested=setting['jit_compile'])
+        if marker:
+            result.update(json.loads(marker[-1].split(' ', 1)[1]))
+        else:
+            result['error'] = 'benchmark worker failed'
+        results.append(result)
+        
+        label = (f"xla={'on' if result['jit_compile'] else 'off'} "
+                 f"intra={setting['intra_op_threads'] or 'default'} "
+                 f"inter={setting['inter_op_threads'] or 'default'}")
+        if 'error' in result:
+            print(f"   {label:<36} ❌ {result['error']}")
+        else:
+            print(f"   {label:<36} {result['step_ms']:8.1f} ms/step "
+                  f"{result['samples_per_sec']:8.1f} samples/sec")
+    
+    valid = [result for result in results if 'error' not in result]
+    report = {'cores': cores, 'batch_size': CONFIG['batch_size'], 'steps': steps,
+              'results': results,
+              'best': max(valid, key=lambda r: r['samples_per_sec']) if valid else None}
+    if report['best']:
+        best = report['best']
+        print(f"🏆 Best: jit_compile={best['jit_compile']}, "
+              f"intra_op_threads={best['intra_op_threads']}, "
+              f"inter_op_threads={best['inter_op_threads']}")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the ad quality & compliance model")
+    parser.add_argument('--augment-in-pipeline', action='store_true',
+                        help="run augmentation in the tf.data pipeline, not in the model")
+    parser.add_argument('--benchmark-augmentation', action='store_true',
+                        help="compare training throughput of both augmentation placements and exit "
+                             "(not with CONFIG['streaming'])")
+    parser.add_argument('--jit-compile', action='store_true',
+                        help="XLA-compile the train step (augmentation runs in the input pipeline)")
+    parser.add_argument('--intra-op-threads', type=int, default=None,
+                        help="threads used within a single op (0 = TensorFlow default)")
+    parser.add_argument('--inter-op-threads', type=int, default=None,
+                        help="ops executed concurrently (0 = TensorFlow default)")
+    parser.add_argument('--distributed', action='store_true',
+                        help="multi-worker data-parallel training; cluster from TF_CONFIG")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from the latest training state checkpoint")
+    parser.add_argument('--time-input', action='store_true',
+                        help="measure input pipeline wait per epoch (feeds training through a "
+                             "Python generator)")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile a window of train steps and the data generation (logs/profile)")
+    parser.add_argument('--profile-start-step', type=int, default=None)
+    parser.add_argument('--profile-steps', type=int, default=None)
+    parser.add_argument('--benchmark-performance', action='store_true',
+                        help="benchmark XLA and thread pool settings and exit")
+    parser.add_argument('--benchmark-steps', type=int, default=20, help=argparse.SUPPRESS)
+    parser.add_argument('--benchmark-worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.benchmark_augmentation and CONFIG['streaming']:
+        # The benchmark draws batches from an indexed (in-RAM or sharded) dataset
+        parser.error("--benchmark-augmentation is not supported with CONFIG['streaming']")
+    return args
+
 def main():
+    args = parse_args()
+    if args.augment_in_pipeline:
+        CONFIG['augment_in_pipeline'] = True
+    if args.jit_compile:
+        CONFIG['jit_compile'] = True
+    if args.intra_op_threads is not None:
+        CONFIG['intra_op_threads'] = args.intra_op_threads
+    if args.inter_op_threads is not None:
+        CONFIG['inter_op_threads'] = args.inter_op_threads
+    if args.distributed:
+        CONFIG['distributed'] = True
+    if args.time_input:
+        CONFIG['time_input'] = True
+    if args.profile:
+        CONFIG['profile'] = True
+    if args.profile_start_step is not None:
+        CONFIG['profile_start_step'] = args.profile_start_step
+    if args.profile_steps is not None:
+        CONFIG['profile_steps'] = args.profile_steps
+    
+    if args.benchmark_performance:
+        benchmark_performance(args.benchmark_steps)
+        return
+    if args.benchmark_worker:
+        result = measure_train_steps(AdQualityTrainer(CONFIG), args.benchmark_steps)
+        print('BENCHMARK_RESULT ' + json.dumps(result))
+        return
+    
     print("="*60)
     print("RetailSync AI - Ad Quality & Compliance Model Training")
     print("="*60)
@@ -301,33 +1004,100 @@ def main():
     # Initialize trainer
     trainer = AdQualityTrainer(CONFIG)
     
-    # Generate synthetic data
-    print("\n📊 Generating training data...")
-    X, y = trainer.generate_synthetic_data(n_samples=1000)
-    
-    # Split data
-    X_train, X_temp, y_train, y_temp = train_test_split(
-        X, y, test_size=0.3, random_state=CONFIG['seed']
-    )
-    X_val, X_test, y_val, y_test = train_test_split(
-        X_temp, y_temp, test_size=0.5, random_state=CONFIG['seed']
-    )
-    
-    print(f"\n📦 Dataset Split:")
-    print(f"   Training: {len(X_train)} samples")
-    print(f"   Validation: {len(X_val)} samples")
-    print(f"   Test: {len(X_test)} samples")
-    
-    # Train model
-    trainer.train(X_train, y_train, X_val, y_val)
+    if CONFIG['streaming']:
+        # Split sample rows 70/15/15; nothing is materialized up front
+        n_samples = CONFIG['n_samples']
+        n_train = int(n_samples * 0.7)
+        n_val = int(n_samples * 0.15)
+        n_test = n_samples - n_train - n_val
+        if min(n_train, n_val, n_test) < 1:
+            raise ValueError(f"n_samples={n_samples} is too small for a 70/15/15 split")
+        val_start, test_start = n_train, n_train + n_val
+        
+        def row_input(start, stop, shuffle=False, training=False):
+            return trainer.input_fn(
+                lambda num_shards, shard_index, batch_size: trainer.make_synthetic_dataset(
+                    start, stop, shuffle, num_shards, shard_index, batch_size),
+                training=training
+            )
+        
+        if CONFIG['profile']:
+            trainer.generation_profile = CallProfile('generate_synthetic_data')
+        
+        print(f"\n📦 Streaming Dataset Split ({CONFIG['chunk_size']} samples per chunk):")
+        print(f"   Training: {n_train} samples")
+        print(f"   Validation: {n_val} samples")
+        print(f"   Test: {n_test} samples")
+        
+        test_samples = take_samples(trainer.make_synthetic_dataset(test_start, n_samples), 10)
+        trainer.train(row_input(0, n_train, shuffle=True, training=True),
+                      X_val=row_input(val_start, test_start), resume=args.resume)
+        trainer.evaluate(row_input(test_start, n_samples), samples=test_samples)
+        if trainer.is_chief:
+            X_calibration, _ = take_samples(trainer.make_synthetic_dataset(0, n_train),
+                                            CONFIG['calibration_samples'])
+            X_eval, _ = take_samples(trainer.make_synthetic_dataset(test_start, n_samples),
+                                     CONFIG['calibration_samples'])
+        if trainer.generation_profile is not None:
+            trainer.generation_profile.close()
+    else:
+        if CONFIG['shard_dir']:
+            # Pre-resized uint8 shards, memory-mapped; no JPEG decoding
+            dataset = ShardedDataset(CONFIG['shard_dir'])
+        else:
+            # Generate synthetic data
+            print("\n📊 Generating training data...")
+            profile = python_profile('generate_synthetic_data') if CONFIG['profile'] \
+                else contextlib.nullcontext()
+            with profile:
+                X, y = trainer.generate_synthetic_data(n_samples=CONFIG['n_samples'],
+                                                       chunk_size=CONFIG['chunk_size'])
+            # Tier ids (0 low, 1 medium, 2 high) from the score ranges of each tier
+            dataset = ArrayDataset(X, y, np.digitize(y[:, 0], [40, 70]))
+        
+        # Split index arrays only; batches are gathered lazily from X or the shards
+        # (only the chief persists it; the split is deterministic on every worker)
+        train_idx, val_idx, test_idx = split_indices(
+            dataset, CONFIG['seed'], path=CONFIG['split_path'] if trainer.is_chief else None
+        )
+        
+        print(f"\n📦 Dataset Split (stratified by tier and compliance):")
+        print(f"   Training: {len(train_idx)} samples")
+        print(f"   Validation: {len(val_idx)} samples")
+        print(f"   Test: {len(test_idx)} samples")
+        
+        if args.benchmark_augmentation:
+            benchmark_augmentation(trainer, dataset, train_idx)
+            return
+        
+        def index_input(indices, shuffle=False, training=False):
+            return trainer.input_fn(
+                lambda num_shards, shard_index, batch_size: dataset.as_tf_dataset(
+                    batch_size, shard_indices(indices, num_shards, shard_index),
+                    shuffle=shuffle, seed=CONFIG['seed'],
+                    epoch_fn=lambda: trainer.current_epoch),
+                training=training
+            )
+        
+        # Train model
+        trainer.train(index_input(train_idx, shuffle=True, training=True),
+                      X_val=index_input(val_idx), resume=args.resume)
+        
+        # Evaluate
+        trainer.evaluate(index_input(test_idx), samples=dataset.get_batch(test_idx[:10]))
+        X_calibration, _ = dataset.get_batch(train_idx[:CONFIG['calibration_samples']])
+        X_eval, _ = dataset.get_batch(test_idx[:CONFIG['calibration_samples']])
     
-    # Evaluate
-    trainer.evaluate(X_test, y_test)
+    # Artifacts and logs come from the chief only
+    if not trainer.is_chief:
+        print(f"\n✅ Worker {trainer.task_id} finished")
+        return
     
     # Save everything
-    trainer.save_model()
+    trainer.save_model(X_calibration, X_eval)
     trainer.plot_training_history()
     trainer.save_training_log()
+    trainer.throughput.print_summary()
     
     print("\n" + "="*60)
     print("✅ Training Complete!")
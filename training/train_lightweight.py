@@ -10,6 +10,8 @@ import numpy as np
 from datetime import datetime
 import random
 
+from dataset_manifest import DatasetManifest
+
 # Configuration
 CONFIG = {
     'img_height': 224,
@@ -371,31 +373,41 @@ Training Loss Visualization:
         print(f"📝 Training log saved to: logs/training_log.json")
     
     def create_dataset_info(self):
-        """Create dataset metadata"""
+        """Create dataset metadata with counts taken from the dataset manifest"""
+        manifest = DatasetManifest()
+        manifest.prune()
+        counts = manifest.counts()
+        total = counts['total_samples']
+        if not total:
+            print("⚠️  Dataset manifest has no samples; run prepare_data.py to populate it")
+        train_samples = int(total * 0.7)
+        val_samples = (total - train_samples) // 2
+        
         dataset_info = {
             'name': 'RetailSync Synthetic Ad Dataset',
             'version': '1.0',
             'created': datetime.now().isoformat(),
             'description': 'Synthetically generated retail ad images for quality and compliance training',
             'statistics': {
-                'total_samples': 1000,
-                'train_samples': 700,
-                'val_samples': 150,
-                'test_samples': 150,
+                'total_samples': total,
+                'train_samples': train_samples,
+                'val_samples': val_samples,
+                'test_samples': total - train_samples - val_samples,
+                'sources': counts['sources'],
                 'image_size': [224, 224, 3],
                 'categories': {
                     'high_quality': {
-                        'count': 400,
+                        'count': counts['tiers'].get('high', 0),
                         'score_range': '70-100',
                         'compliance': 'Pass'
                     },
                     'medium_quality': {
-                        'count': 300,
+                        'count': counts['tiers'].get('medium', 0),
                         'score_range': '40-70',
                         'compliance': 'Conditional'
                     },
                     'low_quality': {
-                        'count': 300,
+                        'count': counts['tiers'].get('low', 0),
                         'score_range': '0-40',
                         'compliance': 'Fail'
                     }
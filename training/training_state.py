@@ -0,0 +1,182 @@
+"""
+Training State Checkpoints
+Periodic snapshots of everything needed to resume a run exactly where it
+stopped: model variables (including the random layers' seed states),
+optimizer variables (step counter, learning rate, moments), the epoch,
+the history so far, EarlyStopping / ReduceLROnPlateau / ModelCheckpoint
+state and the NumPy / Python global RNG states.
+
+Snapshots are copied to host memory at the end of an epoch and written
+to disk by a background thread, so training does not wait on I/O.
+"""
+
+import os
+import re
+import json
+import queue
+import random
+import threading
+import numpy as np
+from tensorflow import keras
+
+STATE_PATTERN = re.compile(r'^state_epoch_(\d{4,})\.npz$')
+
+# Callback attributes that make up their resumable state
+CALLBACK_STATE = {
+    'EarlyStopping': ('wait', 'stopped_epoch', 'best', 'best_epoch'),
+    'ReduceLROnPlateau': ('wait', 'cooldown_counter', 'best'),
+    'ModelCheckpoint': ('best',),
+}
+
+
+def list_checkpoints(directory):
+    """State checkpoint paths in directory, oldest first"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if STATE_PATTERN.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def latest_checkpoint(directory):
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+
+def _to_json(value):
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    return value
+
+
+class StateCheckpoint(keras.callbacks.Callback):
+    def __init__(self, directory, every=1, keep=3, tracked_callbacks=(), extra_models=(),
+                 restore_from=None, write=True):
+        """Snapshot the training state every `every` epochs, keeping the last `keep` files
+
+        tracked_callbacks are the callbacks whose state is saved; this
+        callback must come after them in the list passed to fit so that it
+        restores their state after their own on_train_begin resets it.
+        extra_models are other stateful Keras objects (e.g. pipeline
+        augmentation layers) saved alongside the model. restore_from is a
+        checkpoint path to resume from; fit must then be called with
+        initial_epoch=self.initial_epoch. write=False (non-chief workers)
+        restores but never writes.
+        """
+        super().__init__()
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.tracked_callbacks = list(tracked_callbacks)
+        self.extra_models = list(extra_models)
+        self.write = write
+        self.history = {}
+        self.initial_epoch = 0
+        self._restore_arrays = None
+        self._queue = None
+        self._writer = None
+
+        if restore_from:
+            with np.load(restore_from, allow_pickle=False) as data:
+                self._restore_arrays = {name: data[name] for name in data.files}
+            self._restore_meta = json.loads(str(self._restore_arrays.pop('meta')))
+            self.initial_epoch = self._restore_meta['epoch'] + 1
+            self.history = self._restore_meta['history']
+            print(f"♻️  Resuming from {restore_from} (epoch {self.initial_epoch})")
+
+    def on_train_begin(self, logs=None):
+        if self._restore_arrays is not None:
+            self._restore()
+            self._restore_arrays = None
+        if self.write and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._queue = queue.Queue(maxsize=2)
+            self._writer = threading.Thread(target=self._write_loop, name='state-checkpoint',
+                                            daemon=True)
+            self._writer.start()
+
+    def on_epoch_end(self, epoch, logs=None):
+        for name, value in (logs or {}).items():
+            self.history.setdefault(name, []).append(float(value))
+        if self._queue is not None and (epoch + 1) % self.every == 0:
+            # Copy to host memory now; serialization and disk I/O happen on the writer
+            self._queue.put((epoch, self._snapshot(epoch)))
+
+    def on_train_end(self, logs=None):
+        if self._queue is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._queue = None
+
+    def _variable_groups(self):
+        optimizer = self.model.optimizer
+        if not optimizer.built:
+            optimizer.build(self.model.trainable_variables)
+        groups = {'model': self.model.variables, 'optimizer': optimizer.variables}
+        for i, extra in enumerate(self.extra_models):
+            groups[f'extra{i}'] = extra.variables
+        return groups
+
+    def _snapshot(self, epoch):
+        arrays = {}
+        for group, variables in self._variable_groups().items():
+            for i, variable in enumerate(variables):
+                arrays[f'{group}_{i}'] = np.array(variable.numpy())
+
+        callbacks = []
+        for callback in self.tracked_callbacks:
+            attributes = CALLBACK_STATE.get(type(callback).__name__, ())
+            state = {name: _to_json(getattr(callback, name, None)) for name in attributes}
+            best_weights = getattr(callback, 'best_weights', None)
+            if best_weights is not None:
+                state['n_best_weights'] = len(best_weights)
+                for j, weight in enumerate(best_weights):
+                    arrays[f'callback{len(callbacks)}_best_{j}'] = np.array(weight)
+            callbacks.append(state)
+
+        np_state = np.random.get_state()
+        py_version, py_internal, py_gauss = random.getstate()
+        arrays['numpy_rng_keys'] = np_state[1]
+        meta = {
+            'epoch': epoch,
+            'history': {name: list(values) for name, values in self.history.items()},
+            'callbacks': callbacks,
+            'numpy_rng': [np_state[0], int(np_state[2]), int(np_state[3]), float(np_state[4])],
+            'python_rng': [py_version, list(py_internal), py_gauss],
+        }
+        arrays['meta'] = np.array(json.dumps(meta))
+        return arrays
+
+    def _restore(self):
+        arrays, meta = self._restore_arrays, self._restore_meta
+        for group, variables in self._variable_groups().items():
+            for i, variable in enumerate(variables):
+                variable.assign(arrays[f'{group}_{i}'])
+
+        for i, (callback, state) in enumerate(zip(self.tracked_callbacks, meta['callbacks'])):
+            n_best = state.pop('n_best_weights', None)
+            for name, value in state.items():
+                setattr(callback, name, value)
+            if n_best is not None:
+                callback.best_weights = [arrays[f'callback{i}_best_{j}'] for j in range(n_best)]
+
+        name, pos, has_gauss, cached_gaussian = meta['numpy_rng']
+        np.random.set_state((name, arrays['numpy_rng_keys'], pos, has_gauss, cached_gaussian))
+        version, internal, gauss = meta['python_rng']
+        random.setstate((version, tuple(internal), gauss))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            epoch, arrays = item
+            path = os.path.join(self.directory, f'state_epoch_{epoch:04d}.npz')
+            try:
+                # Write then rename, so a crash mid-write never leaves a corrupt latest checkpoint
+                tmp_path = path + '.tmp.npz'
+                np.savez(tmp_path, **arrays)
+                os.replace(tmp_path, path)
+                for old in list_checkpoints(self.directory)[:-self.keep]:
+                    os.remove(old)
+            except Exception as e:
+                print(f"⚠️  Failed to write training state checkpoint {path}: {e}")